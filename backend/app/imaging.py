@@ -17,11 +17,9 @@ from .deps import get_settings
 
 
 def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb", buffering=1024 * 1024) as f:
-        for chunk in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(chunk)
-    return h.hexdigest()
+    # file_digest reads into one reusable buffer instead of a new bytes per chunk.
+    with path.open("rb", buffering=0) as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
 def _parse_exif_datetime(value: Optional[Any]) -> Optional[datetime]:
@@ -61,9 +61,17 @@ async def list_assets(
     )
     rows = (await db.execute(q)).all()
     storage = PosixStorage.from_env()
+    variants_by_asset = await assets_service.load_derivative_variants(
+        db, [asset.id for asset, *_ in rows]
+    )
     return [
         assets_service.serialize_asset_item(
-            asset, project_asset, pair, storage, metadata
+            asset,
+            project_asset,
+            pair,
+            storage,
+            metadata,
+            variants_by_asset.get(asset.id, set()),
         )
         for asset, project_asset, pair, metadata in rows
     ]
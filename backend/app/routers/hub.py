@@ -31,22 +31,21 @@ def _color_label_to_schema(
     return schemas.ColorLabel.NONE
 
 
-def _thumb_url(asset: models.Asset, storage: PosixStorage) -> str | None:
+def _derivative_urls(
+    asset: models.Asset, storage: PosixStorage
+) -> tuple[str | None, str | None]:
     if not asset.sha256:
-        return None
-    path = storage.find_derivative(asset.sha256, "thumb_256", "jpg")
-    if path:
-        return f"/v1/assets/{asset.id}/thumbs/256"
-    return None
-
-
-def _preview_url(asset: models.Asset, storage: PosixStorage) -> str | None:
-    if not asset.sha256:
-        return None
-    path = storage.find_derivative(asset.sha256, "preview_raw", "jpg")
-    if path:
-        return f"/v1/assets/{asset.id}/preview"
-    return None
+        return None, None
+    found = storage.find_derivatives_bulk(
+        asset.sha256, [("thumb_256", "jpg"), ("preview_raw", "jpg")]
+    )
+    thumb = (
+        f"/v1/assets/{asset.id}/thumbs/256" if ("thumb_256", "jpg") in found else None
+    )
+    preview = (
+        f"/v1/assets/{asset.id}/preview" if ("preview_raw", "jpg") in found else None
+    )
+    return thumb, preview
 
 
 @router.get("/assets", response_model=schemas.ImageHubAssetsResponse)
@@ -180,6 +179,7 @@ async def list_hub_assets(
                 )
             )
 
+        thumb_url, preview_url = _derivative_urls(asset, storage)
         ordered_assets.append(
             schemas.HubAsset(
                 asset_id=asset.id,
@@ -190,8 +190,8 @@ async def list_hub_assets(
                 original_filename=asset.original_filename,
                 taken_at=asset.taken_at,
                 created_at=asset.created_at,
-                thumb_url=_thumb_url(asset, storage),
-                preview_url=_preview_url(asset, storage),
+                thumb_url=thumb_url,
+                preview_url=preview_url,
                 projects=proj_entries,
                 pair_asset_id=pair_map.get(asset.id),
             )
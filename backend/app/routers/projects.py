@@ -466,7 +466,7 @@ async def delete_project(
                 )
             if duplicates == 0:
                 storage.remove_original(asset.storage_uri)
-                storage.remove_derivatives(asset.sha256)
+                await storage.remove_derivatives_async(asset.sha256)
             await db.delete(asset)
             removed_assets += 1
         else:
@@ -90,8 +90,10 @@ async def set_database_path(
     return result
 
 
-def _build_photo_store_response(state, *, enabled: bool) -> schemas.PhotoStoreSettings:
-    entries = make_location_payload(state)
+async def _build_photo_store_response(
+    state, *, enabled: bool
+) -> schemas.PhotoStoreSettings:
+    entries = await make_location_payload(state)
     warning_active = any(item["status"] != "available" for item in entries)
     locations = [schemas.PhotoStoreLocation(**item) for item in entries]
     return schemas.PhotoStoreSettings(
@@ -115,7 +117,7 @@ async def get_photo_store_settings_api() -> schemas.PhotoStoreSettings:
             locations=[],
         )
     state = prepare_state(Path(settings.fs_root))
-    return _build_photo_store_response(state, enabled=enabled)
+    return await _build_photo_store_response(state, enabled=enabled)
 
 
 @router.post("/photo-store/validate", response_model=schemas.PhotoStoreValidationResult)
@@ -189,4 +191,4 @@ async def apply_photo_store_change(
         await wipe_application_data(db)
     await db.commit()
     persist_photo_store_state(next_state)
-    return _build_photo_store_response(next_state, enabled=enabled)
+    return await _build_photo_store_response(next_state, enabled=enabled)
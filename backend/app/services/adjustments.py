@@ -7,12 +7,16 @@ from .. import schemas
 def apply_adjustments(
     image: Image.Image, adjustments: schemas.QuickFixAdjustments | None
 ) -> Image.Image:
-    """Apply the configured adjustments in a deterministic order."""
+    """Apply the configured adjustments in a deterministic order.
+
+    Currently a passthrough: the input image is returned as-is (not a copy),
+    so callers must not mutate the result in place.
+    """
 
     # FIXME: Deactivated for client-side transition (QuickFix Renderer)
     # logic moved to frontend (WASM)
     # See: https://github.com/JoMe92/quickfix-renderer
-    return image.copy()
+    return image
 
     # if adjustments is None:
     #     return image.copy()
@@ -80,15 +84,28 @@ def _apply_highlights_shadows(
     return result
 
 
+def _contrast_active(contrast: float) -> bool:
+    return bool(contrast) and abs(contrast - 1.0) > 1e-3
+
+
 def apply_exposure(
     image: Image.Image, settings: schemas.ExposureSettings
 ) -> Image.Image:
+    # Neutral settings: skip the float32 round-trip (and any implicit mode change).
+    if (
+        not settings.exposure
+        and not _contrast_active(settings.contrast)
+        and not settings.highlights
+        and not settings.shadows
+    ):
+        return image
+
     arr = np.asarray(image).astype(np.float32) / 255.0
 
     if settings.exposure:
         arr = arr * pow(2.0, settings.exposure)
 
-    if settings.contrast and abs(settings.contrast - 1.0) > 1e-3:
+    if _contrast_active(settings.contrast):
         arr = (arr - 0.5) * settings.contrast + 0.5
 
     arr = _apply_highlights_shadows(arr, settings)
@@ -100,7 +117,7 @@ def apply_exposure(
 def apply_color_balance(
     image: Image.Image, settings: schemas.ColorSettings
 ) -> Image.Image:
-    if not settings.temperature and not settings.tint:
+    if abs(settings.temperature) <= 1e-3 and abs(settings.tint) <= 1e-3:
         return image
 
     arr = np.asarray(image).astype(np.float32)
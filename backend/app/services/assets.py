@@ -1,11 +1,14 @@
 import asyncio
-import json
 import logging
+import os
 from datetime import datetime
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Sequence
-from uuid import UUID
+from typing import Any, Collection, Sequence
+from uuid import UUID, uuid4
 
+import orjson
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -15,60 +18,124 @@ from ..imaging import read_exif
 
 logger = logging.getLogger("arciva.assets")
 
+THUMB_VARIANT = "thumb_256"
+PREVIEW_VARIANT = "preview_raw"
+POPULATED_CACHE_SIZE = 10_000
+
+# sha256 values whose asset rows are complete and whose metadata cache file was
+# written or read; lets the backfill skip reading and parsing it for warm
+# assets. The file itself is still checked, since derivatives/<sha> can be
+# removed (by this or another process) at any time.
+_populated_sha256: OrderedDict[str, None] = OrderedDict()
+
 
 def warnings_from_text(data: str | None) -> list[str]:
     if not data:
         return []
-    return [entry for entry in data.split("\n") if entry]
+    return list(filter(None, data.splitlines()))
+
 
+def thumb_url(
+    asset: models.Asset,
+    storage: PosixStorage,
+    variants: Collection[str] | None = None,
+) -> str | None:
+    """Return the thumbnail URL if the derivative exists.
 
-def thumb_url(asset: models.Asset, storage: PosixStorage) -> str | None:
+    When ``variants`` (the asset's known derivative variants) is given, it is
+    used instead of probing the filesystem.
+    """
     if not asset.sha256:
         return None
-    path = storage.find_derivative(asset.sha256, "thumb_256", "jpg")
-    if path:
+    if variants is not None:
+        exists = THUMB_VARIANT in variants
+    else:
+        exists = storage.find_derivative(asset.sha256, THUMB_VARIANT, "jpg") is not None
+    if exists:
         return f"/v1/assets/{asset.id}/thumbs/256"
     return None
 
 
-def preview_url(asset: models.Asset, storage: PosixStorage) -> str | None:
+def preview_url(
+    asset: models.Asset,
+    storage: PosixStorage,
+    variants: Collection[str] | None = None,
+) -> str | None:
+    """Return the preview URL if the derivative exists (see ``thumb_url``)."""
     if not asset.sha256:
         return None
-    path = storage.find_derivative(asset.sha256, "preview_raw", "jpg")
-    if path:
+    if variants is not None:
+        exists = PREVIEW_VARIANT in variants
+    else:
+        exists = (
+            storage.find_derivative(asset.sha256, PREVIEW_VARIANT, "jpg") is not None
+        )
+    if exists:
         return f"/v1/assets/{asset.id}/preview"
     return None
 
 
-async def collect_derivatives(
-    asset: models.Asset,
-    db: AsyncSession,
-) -> list[schemas.AssetDerivativeOut]:
+async def load_derivative_variants(
+    db: AsyncSession, asset_ids: Sequence[UUID]
+) -> dict[UUID, set[str]]:
+    """Return the recorded derivative variants per asset in a single query."""
+    variants: dict[UUID, set[str]] = {}
+    if not asset_ids:
+        return variants
+    rows = await db.execute(
+        select(models.Derivative.asset_id, models.Derivative.variant).where(
+            models.Derivative.asset_id.in_(asset_ids)
+        )
+    )
+    for asset_id, variant in rows:
+        variants.setdefault(asset_id, set()).add(variant)
+    return variants
+
+
+async def collect_derivatives_bulk(
+    db: AsyncSession, asset_ids: Sequence[UUID]
+) -> dict[UUID, list[schemas.AssetDerivativeOut]]:
+    """Return the derivatives of several assets in a single query."""
+    derivatives: dict[UUID, list[schemas.AssetDerivativeOut]] = {}
+    if not asset_ids:
+        return derivatives
     rows = (
         (
             await db.execute(
-                select(models.Derivative).where(models.Derivative.asset_id == asset.id)
+                select(models.Derivative).where(
+                    models.Derivative.asset_id.in_(asset_ids)
+                )
             )
         )
         .scalars()
         .all()
     )
-    derivatives: list[schemas.AssetDerivativeOut] = []
     for row in rows:
-        derivatives.append(
+        derivatives.setdefault(row.asset_id, []).append(
             schemas.AssetDerivativeOut(
                 variant=row.variant,
                 width=row.width,
                 height=row.height,
-                url=f"/v1/assets/{asset.id}/derivatives/{row.variant}",
+                url=f"/v1/assets/{row.asset_id}/derivatives/{row.variant}",
             )
         )
     return derivatives
 
 
+async def collect_derivatives(
+    asset: models.Asset,
+    db: AsyncSession,
+) -> list[schemas.AssetDerivativeOut]:
+    return (await collect_derivatives_bulk(db, [asset.id])).get(asset.id, [])
+
+
+@lru_cache(maxsize=4096)
 def basename_from_filename(name: str | None) -> str | None:
     if not name:
         return None
+    # Path.stem, not os.path.splitext: they disagree on names such as "IMG."
+    # and "dir/", and the result is a pairing key. Memoized, so the Path is
+    # built once per distinct filename.
     stem = Path(name).stem
     return stem.strip() or None
 
@@ -92,9 +159,12 @@ def serialize_asset_item(
     pair: models.ProjectAssetPair | None,
     storage: PosixStorage,
     metadata: models.MetadataState | None,
+    variants: Collection[str] | None = None,
 ) -> schemas.AssetListItem:
-    t_url = thumb_url(asset, storage)
-    p_url = preview_url(asset, storage)
+    # Built with model_construct: every value comes from trusted ORM rows and
+    # FastAPI validates the response model on the way out anyway.
+    t_url = thumb_url(asset, storage, variants)
+    p_url = preview_url(asset, storage, variants)
     pair_role: schemas.ImgType | None = None
     paired_asset_id: UUID | None = None
     paired_asset_type: schemas.ImgType | None = None
@@ -118,7 +188,7 @@ def serialize_asset_item(
     metadata_state_id = metadata.id if metadata else None
     metadata_source_project_id = metadata.source_project_id if metadata else None
 
-    return schemas.AssetListItem(
+    return schemas.AssetListItem.model_construct(
         id=asset.id,
         link_id=project_asset.id,
         status=schemas.AssetStatus(asset.status.value),
@@ -187,8 +257,18 @@ async def load_asset_items(
         query = query.where(models.ProjectAsset.asset_id.in_(asset_ids))
     rows = (await db.execute(query)).all()
     storage = PosixStorage.from_env()
+    variants_by_asset = await load_derivative_variants(
+        db, [asset.id for asset, *_ in rows]
+    )
     items = [
-        serialize_asset_item(asset, project_asset, pair, storage, metadata)
+        serialize_asset_item(
+            asset,
+            project_asset,
+            pair,
+            storage,
+            metadata,
+            variants_by_asset.get(asset.id, set()),
+        )
         for asset, project_asset, pair, metadata in rows
     ]
     if asset_ids:
@@ -228,6 +308,7 @@ async def asset_detail(
     link: models.ProjectAsset | None = None,
     metadata: models.MetadataState | None = None,
 ) -> schemas.AssetDetail:
+    # See serialize_asset_item for why validation is skipped here.
     t_url = thumb_url(asset, storage)
     p_url = preview_url(asset, storage)
     derivatives = await collect_derivatives(asset, db)
@@ -238,7 +319,7 @@ async def asset_detail(
 
     metadata_state_out: schemas.MetadataStateOut | None = None
     if metadata and link:
-        metadata_state_out = schemas.MetadataStateOut(
+        metadata_state_out = schemas.MetadataStateOut.model_construct(
             id=metadata.id,
             link_id=link.id,
             project_id=link.project_id,
@@ -251,7 +332,7 @@ async def asset_detail(
             created_at=metadata.created_at,
             updated_at=metadata.updated_at,
         )
-    return schemas.AssetDetail(
+    return schemas.AssetDetail.model_construct(
         id=asset.id,
         status=schemas.AssetStatus(asset.status.value),
         original_filename=asset.original_filename,
@@ -302,8 +383,7 @@ def load_metadata_cache(
     if not path or not path.exists():
         return None
     try:
-        with path.open("r", encoding="utf-8") as fh:
-            payload = json.load(fh)
+        payload = orjson.loads(path.read_bytes())
         if isinstance(payload, dict):
             return payload
     except Exception:
@@ -313,83 +393,73 @@ def load_metadata_cache(
 
 def write_metadata_cache(
     storage: PosixStorage, asset: models.Asset, payload: dict[str, Any]
-) -> None:
+) -> bool:
     path = metadata_cache_path(storage, asset, ensure=True)
     if not path:
-        return
+        return False
+    # Write to a unique sibling and rename so readers never see a torn file.
+    tmp = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
     try:
-        serialized = json.dumps(payload, ensure_ascii=False)
-        path.write_text(serialized, encoding="utf-8")
+        tmp.write_bytes(orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS))
+        os.replace(tmp, path)
     except Exception:
+        tmp.unlink(missing_ok=True)
         logger.warning("metadata_cache_write_failed asset=%s", asset.id, exc_info=True)
+        return False
+    return True
 
 
-async def ensure_asset_metadata_populated(
-    asset: models.Asset,
-    db: AsyncSession,
-    storage: PosixStorage,
-) -> None:
-    cache_payload = load_metadata_cache(storage, asset)
+def _metadata_cache_payload(asset: models.Asset, warnings: list[str]) -> dict[str, Any]:
+    return {
+        "metadata": asset.metadata_json,
+        "taken_at": (asset.taken_at.isoformat() if asset.taken_at else None),
+        "width": asset.width,
+        "height": asset.height,
+        "warnings": warnings,
+    }
+
+
+def _apply_metadata_cache(asset: models.Asset, cache_payload: dict[str, Any]) -> bool:
     cache_taken_at: datetime | None = None
-    if cache_payload:
-        taken_str = cache_payload.get("taken_at")
-        if isinstance(taken_str, str):
-            try:
-                cache_taken_at = datetime.fromisoformat(taken_str)
-            except ValueError:
-                cache_taken_at = None
+    taken_str = cache_payload.get("taken_at")
+    if isinstance(taken_str, str):
+        try:
+            cache_taken_at = datetime.fromisoformat(taken_str)
+        except ValueError:
+            cache_taken_at = None
     changed = False
-    if cache_payload:
-        cached_metadata = cache_payload.get("metadata")
-        if cached_metadata and not asset.metadata_json:
-            asset.metadata_json = cached_metadata
-            changed = True
-        if cache_taken_at and not asset.taken_at:
-            asset.taken_at = cache_taken_at
-            changed = True
-        cached_width = cache_payload.get("width")
-        cached_height = cache_payload.get("height")
-        if isinstance(cached_width, int) and not asset.width:
-            asset.width = cached_width
-            changed = True
-        if isinstance(cached_height, int) and not asset.height:
-            asset.height = cached_height
-            changed = True
-        cached_warnings = cache_payload.get("warnings")
-        if isinstance(cached_warnings, list) and not asset.metadata_warnings:
-            asset.metadata_warnings = "\n".join(str(w) for w in cached_warnings if w)
-            changed = True
-    if changed:
-        await db.commit()
-        await db.refresh(asset)
-
-    if asset.metadata_json and asset.taken_at and asset.width and asset.height:
-        if not cache_payload:
-            write_metadata_cache(
-                storage,
-                asset,
-                {
-                    "metadata": asset.metadata_json,
-                    "taken_at": (
-                        asset.taken_at.isoformat() if asset.taken_at else None
-                    ),
-                    "width": asset.width,
-                    "height": asset.height,
-                    "warnings": warnings_from_text(asset.metadata_warnings),
-                },
-            )
-        return
+    cached_metadata = cache_payload.get("metadata")
+    if cached_metadata and not asset.metadata_json:
+        asset.metadata_json = cached_metadata
+        changed = True
+    if cache_taken_at and not asset.taken_at:
+        asset.taken_at = cache_taken_at
+        changed = True
+    cached_width = cache_payload.get("width")
+    cached_height = cache_payload.get("height")
+    if isinstance(cached_width, int) and not asset.width:
+        asset.width = cached_width
+        changed = True
+    if isinstance(cached_height, int) and not asset.height:
+        asset.height = cached_height
+        changed = True
+    cached_warnings = cache_payload.get("warnings")
+    if isinstance(cached_warnings, list) and not asset.metadata_warnings:
+        asset.metadata_warnings = "\n".join(str(w) for w in cached_warnings if w)
+        changed = True
+    return changed
+
 
-    source_path: Path | None = None
+def _metadata_source_path(asset: models.Asset, storage: PosixStorage) -> Path | None:
     if asset.storage_uri:
         try:
             candidate = storage.path_from_key(asset.storage_uri)
         except ValueError:
             candidate = None
         if candidate and candidate.exists():
-            source_path = candidate
+            return candidate
 
-    if source_path is None and asset.sha256:
+    if asset.sha256:
         ext = Path(asset.original_filename or "").suffix
         if not ext and asset.mime:
             if asset.mime == "image/jpeg":
@@ -402,25 +472,16 @@ async def ensure_asset_metadata_populated(
                 ext = ""
         if ext and not ext.startswith("."):
             ext = f".{ext}"
-        if asset.sha256:
-            candidate = storage.originals / f"{asset.sha256}{ext or ''}"
-            if candidate.exists():
-                source_path = candidate
+        candidate = storage.originals / f"{asset.sha256}{ext or ''}"
+        if candidate.exists():
+            return candidate
+    return None
 
-    if source_path is None or not source_path.exists():
-        return
-
-    try:
-        taken_at, (width, height), metadata, warnings = await asyncio.to_thread(
-            read_exif, source_path
-        )
-    except Exception:
-        logger.exception(
-            "ensure_asset_metadata_populated: read_exif failed asset=%s",
-            asset.id,
-        )
-        return
 
+def _apply_exif_result(
+    asset: models.Asset, result: tuple[Any, Any, Any, list[str]]
+) -> tuple[bool, list[str]]:
+    taken_at, (width, height), metadata, warnings = result
     changed = False
     existing = warnings_from_text(asset.metadata_warnings)
 
@@ -453,18 +514,68 @@ async def ensure_asset_metadata_populated(
     if (asset.metadata_warnings or None) != combined_text:
         asset.metadata_warnings = combined_text
         changed = True
+    return changed, combined
 
-    if changed:
+
+def _is_complete(asset: models.Asset) -> bool:
+    return bool(asset.metadata_json and asset.taken_at and asset.width and asset.height)
+
+
+def _is_known_populated(asset: models.Asset, storage: PosixStorage) -> bool:
+    if asset.sha256 is None or asset.sha256 not in _populated_sha256:
+        return False
+    path = metadata_cache_path(storage, asset)
+    return _is_complete(asset) and path is not None and path.exists()
+
+
+def _remember_populated(asset: models.Asset) -> None:
+    if not asset.sha256 or not _is_complete(asset):
+        return
+    _populated_sha256[asset.sha256] = None
+    _populated_sha256.move_to_end(asset.sha256)
+    while len(_populated_sha256) > POPULATED_CACHE_SIZE:
+        _populated_sha256.popitem(last=False)
+
+
+async def ensure_asset_metadata_populated(
+    asset: models.Asset,
+    db: AsyncSession,
+    storage: PosixStorage,
+) -> None:
+    if _is_known_populated(asset, storage):
+        return
+    cache_payload = load_metadata_cache(storage, asset)
+    if cache_payload and _apply_metadata_cache(asset, cache_payload):
+        # No refresh needed: the values were set here and sessions are created
+        # with expire_on_commit=False.
         await db.commit()
-        await db.refresh(asset)
-        write_metadata_cache(
+
+    if _is_complete(asset):
+        if cache_payload or write_metadata_cache(
             storage,
             asset,
-            {
-                "metadata": asset.metadata_json,
-                "taken_at": (asset.taken_at.isoformat() if asset.taken_at else None),
-                "width": asset.width,
-                "height": asset.height,
-                "warnings": combined,
-            },
+            _metadata_cache_payload(asset, warnings_from_text(asset.metadata_warnings)),
+        ):
+            _remember_populated(asset)
+        return
+
+    source_path = _metadata_source_path(asset, storage)
+    if source_path is None:
+        return
+
+    try:
+        result = await asyncio.to_thread(read_exif, source_path)
+    except Exception:
+        logger.exception(
+            "ensure_asset_metadata_populated: read_exif failed asset=%s",
+            asset.id,
         )
+        return
+
+    changed, combined = _apply_exif_result(asset, result)
+    if changed:
+        await db.commit()
+        if write_metadata_cache(
+            storage, asset, _metadata_cache_payload(asset, combined)
+        ):
+            _remember_populated(asset)
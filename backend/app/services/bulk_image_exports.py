@@ -1,16 +1,20 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
+import os
+import queue
 import re
 import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import AsyncIterator, Iterable
+from typing import AsyncIterator, Sequence
 from uuid import UUID
 
-from sqlalchemy import exists, func, select
+from sqlalchemy import exists, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models
@@ -25,8 +29,18 @@ logger = logging.getLogger("arciva.bulk_image_exports")
 DATE_BASIS_LABEL = "capture-date"
 FOLDER_TEMPLATE = "year/month/day"
 ARCHIVE_PREFIX = "arciva-images"
+# Progress is written at most this often instead of once per N files.
+PROGRESS_INTERVAL_SECONDS = 2.0
+# Job assets are loaded this many ids per query.
 CHUNK_SIZE = 64
-COMMIT_INTERVAL = 25
+WRITER_QUEUE_SIZE = 64
+COPY_BUFFER_SIZE = 1 << 20
+CLEANUP_CONCURRENCY = 8
+_PATH_SEPARATORS_RE = re.compile(r"[\\/]+")
+# Formats that are already compressed; deflating them burns CPU for ~0% gain.
+PRECOMPRESSED_MIMES = frozenset(
+    {"image/jpeg", "image/png", "image/heic", "image/heif", "image/webp"}
+)
 
 
 def _bulk_export_conditions(user_id: UUID):
@@ -41,17 +55,21 @@ def _bulk_export_conditions(user_id: UUID):
     )
 
 
+def _bulk_export_order():
+    return (
+        models.Asset.taken_at.is_(None),
+        models.Asset.taken_at.asc(),
+        models.Asset.created_at.asc(),
+    )
+
+
 async def collect_bulk_export_asset_ids(db: AsyncSession, user_id: UUID) -> list[UUID]:
     rows = (
         (
             await db.execute(
                 select(models.Asset.id)
                 .where(*_bulk_export_conditions(user_id))
-                .order_by(
-                    models.Asset.taken_at.is_(None),
-                    models.Asset.taken_at.asc(),
-                    models.Asset.created_at.asc(),
-                )
+                .order_by(*_bulk_export_order())
             )
         )
         .scalars()
@@ -104,79 +122,189 @@ def _safe_filename(asset: models.Asset) -> str:
     if not base:
         base = asset.id.hex
     base = Path(base).name or asset.id.hex
-    sanitized = re.sub(r"[\\/]+", "-", base).strip() or asset.id.hex
+    sanitized = _PATH_SEPARATORS_RE.sub("-", base).strip() or asset.id.hex
     if "." not in sanitized:
         sanitized = f"{sanitized}{_guess_extension(asset)}"
     return sanitized
 
 
-def _build_member_path(asset: models.Asset, used: set[str]) -> Path:
+def _compress_type(asset: models.Asset) -> int:
+    if (asset.mime or "").lower() in PRECOMPRESSED_MIMES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _build_member_path(asset: models.Asset, used: set[str]) -> str:
+    """Return a unique ``YYYY/MM/DD/<filename>`` archive member name."""
     ref = _pick_reference_date(asset)
     if ref.tzinfo is None:
         ref = ref.replace(tzinfo=timezone.utc)
     else:
         ref = ref.astimezone(timezone.utc)
-    year = f"{ref.year:04d}"
-    month = f"{ref.month:02d}"
-    day = f"{ref.day:02d}"
+    folder = f"{ref.year:04d}/{ref.month:02d}/{ref.day:02d}/"
     filename = _safe_filename(asset)
-    rel = Path(year) / month / day / filename
-    candidate = rel
-    counter = 1
-    while str(candidate) in used:
-        candidate = rel.with_name(f"{rel.stem}-{counter}{rel.suffix}")
-        counter += 1
-    used.add(str(candidate))
+    candidate = folder + filename
+    if candidate in used:
+        stem, suffix = os.path.splitext(filename)
+        counter = 1
+        while candidate in used:
+            candidate = f"{folder}{stem}-{counter}{suffix}"
+            counter += 1
+    used.add(candidate)
     return candidate
 
 
+def _write_member(
+    zf: zipfile.ZipFile, source: str, member: str, compress_type: int
+) -> None:
+    if compress_type != zipfile.ZIP_STORED:
+        zf.write(source, member, compress_type)
+        return
+    # Stored members are a plain copy: stream in large chunks and hint the
+    # kernel to read ahead instead of going through zf.write's 16 KiB loop.
+    zinfo = zipfile.ZipInfo.from_file(source, arcname=member)
+    zinfo.compress_type = zipfile.ZIP_STORED
+    with open(source, "rb", buffering=0) as src, zf.open(zinfo, "w") as dst:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(src.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+
+
+class _ArchiveWriter:
+    """Own the zip archive on one dedicated thread fed by the event loop.
+
+    The loop hands over ``(source, member, compress_type)`` entries while fewer
+    than ``WRITER_QUEUE_SIZE`` are pending. The writer thread drains them in
+    order and reports each written member back with ``call_soon_threadsafe``,
+    which frees a slot and wakes the loop without polling.
+    """
+
+    _DONE = object()
+
+    def __init__(self, archive_path: Path) -> None:
+        self.archive_path = archive_path
+        self.written = 0
+        self._loop = asyncio.get_running_loop()
+        self._entries: queue.SimpleQueue = queue.SimpleQueue()
+        self._free = WRITER_QUEUE_SIZE
+        self._changed = asyncio.Event()
+        self._aborted = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="bulk-export-zip"
+        )
+        self._future = self._loop.run_in_executor(self._executor, self._run)
+        self._future.add_done_callback(lambda _: self._changed.set())
+
+    def _run(self) -> None:
+        with zipfile.ZipFile(
+            self.archive_path,
+            "w",
+            compression=zipfile.ZIP_STORED,
+            allowZip64=True,
+        ) as zf:
+            while True:
+                item = self._entries.get()
+                if item is self._DONE:
+                    return
+                if self._aborted:
+                    continue
+                _write_member(zf, *item)
+                self._loop.call_soon_threadsafe(self._member_written)
+
+    def _member_written(self) -> None:
+        self.written += 1
+        self._free += 1
+        self._changed.set()
+
+    async def _wait_for_change(self) -> None:
+        self._changed.clear()
+        await self._changed.wait()
+
+    async def add(self, source: Path, member: str, compress_type: int) -> None:
+        while self._free == 0 and not self._future.done():
+            await self._wait_for_change()
+        if self._future.done():
+            # The writer stopped early; surface its exception.
+            await self._future
+            raise RuntimeError("Archive writer exited unexpectedly")
+        self._free -= 1
+        self._entries.put((str(source), member, compress_type))
+
+    async def drain(self) -> AsyncIterator[int]:
+        """Finish the archive, yielding the written count as members land."""
+        try:
+            if not self._future.done():
+                self._entries.put(self._DONE)
+            while not self._future.done():
+                await self._wait_for_change()
+                yield self.written
+            await self._future
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def close(self, *, abort: bool = False) -> None:
+        self._aborted = abort
+        try:
+            if not self._future.done():
+                self._entries.put(self._DONE)
+            await self._future
+        finally:
+            self._executor.shutdown(wait=False)
+
+
 async def _iter_assets(
-    db: AsyncSession, asset_ids: Iterable[UUID], user_id: UUID
+    db: AsyncSession, asset_ids: Sequence[UUID], user_id: UUID
 ) -> AsyncIterator[models.Asset]:
-    batch = []
-    for asset_id in asset_ids:
-        batch.append(asset_id)
-        if len(batch) >= CHUNK_SIZE:
-            rows = (
-                (
-                    await db.execute(
-                        select(models.Asset).where(
-                            models.Asset.id.in_(batch),
-                            models.Asset.user_id == user_id,
-                        )
-                    )
-                )
-                .scalars()
-                .all()
-            )
-            mapping = {asset.id: asset for asset in rows}
-            for item in batch:
-                asset = mapping.get(item)
-                if not asset:
-                    raise RuntimeError(f"Asset {item} missing for bulk export")
-                yield asset
-            batch = []
-    if batch:
+    # asset_ids is already in export order (see collect_bulk_export_asset_ids),
+    # so each chunk of ids is loaded and ordered in SQL. The export conditions
+    # are not re-applied: an asset unlinked after the job was queued is still
+    # exported, as selected. Every chunk is fetched in full before yielding:
+    # the caller commits progress on the same session, which would invalidate
+    # an open cursor (and hold a read lock on SQLite).
+    for start in range(0, len(asset_ids), CHUNK_SIZE):
+        batch = asset_ids[start : start + CHUNK_SIZE]
         rows = (
             (
                 await db.execute(
-                    select(models.Asset).where(
+                    select(models.Asset)
+                    .where(
                         models.Asset.id.in_(batch),
                         models.Asset.user_id == user_id,
                     )
+                    .order_by(*_bulk_export_order())
                 )
             )
             .scalars()
             .all()
         )
-        mapping = {asset.id: asset for asset in rows}
-        for item in batch:
-            asset = mapping.get(item)
-            if not asset:
-                raise RuntimeError(f"Asset {item} missing for bulk export")
+        if len(rows) != len(batch):
+            found = {asset.id for asset in rows}
+            missing = next(item for item in batch if item not in found)
+            raise RuntimeError(f"Asset {missing} missing for bulk export")
+        for asset in rows:
             yield asset
 
 
+def _progress_for(processed: int, total: int) -> int:
+    return min(95, int((processed / max(total, 1)) * 95))
+
+
+async def _report_progress(
+    db: AsyncSession, job: models.BulkImageExport, processed: int
+) -> None:
+    # A targeted UPDATE of the two progress columns; the session's copy of the
+    # job is kept in sync by the ORM's evaluate strategy.
+    await db.execute(
+        update(models.BulkImageExport)
+        .where(models.BulkImageExport.id == job.id)
+        .values(
+            processed_files=processed,
+            progress=_progress_for(processed, job.total_files),
+        )
+    )
+    await db.commit()
+
+
 async def process_bulk_image_export(job_id: UUID) -> None:
     settings = get_settings()
     storage = PosixStorage.from_env()
@@ -221,14 +349,19 @@ async def process_bulk_image_export(job_id: UUID) -> None:
 
         processed = 0
         used_paths: set[str] = set()
+        loop = asyncio.get_running_loop()
+        last_report = loop.time()
+
+        async def _throttled_progress(written: int) -> None:
+            nonlocal last_report
+            now = loop.time()
+            if now - last_report >= PROGRESS_INTERVAL_SECONDS:
+                last_report = now
+                await _report_progress(db, job, written)
 
         try:
-            with zipfile.ZipFile(
-                archive_path,
-                "w",
-                compression=zipfile.ZIP_DEFLATED,
-                allowZip64=True,
-            ) as zf:
+            writer = _ArchiveWriter(archive_path)
+            try:
                 async for asset in _iter_assets(db, asset_ids, job.user_id):
                     if not asset.storage_uri:
                         raise RuntimeError(f"Asset {asset.id} missing storage path")
@@ -236,21 +369,23 @@ async def process_bulk_image_export(job_id: UUID) -> None:
                         source_path = storage.path_from_key(asset.storage_uri)
                     except ValueError as exc:
                         raise RuntimeError(
-                            f"Invalid storage key for asset {asset.id}: {exc}"
+                            f"Invalid storage key {asset.storage_uri!r} "
+                            f"for asset {asset.id}: {exc}"
                         ) from exc
                     if not source_path.exists():
                         raise RuntimeError(f"Asset source missing: {source_path}")
                     member_path = _build_member_path(asset, used_paths)
-                    await asyncio.to_thread(
-                        zf.write, str(source_path), str(member_path)
-                    )
-                    processed += 1
-                    job.processed_files = processed
-                    job.progress = min(
-                        95, int((processed / max(job.total_files, 1)) * 95)
-                    )
-                    if processed % COMMIT_INTERVAL == 0:
-                        await db.commit()
+                    await writer.add(source_path, member_path, _compress_type(asset))
+                    await _throttled_progress(writer.written)
+                # Keep reporting while the writer works through its backlog.
+                async for written in writer.drain():
+                    await _throttled_progress(written)
+            except BaseException:
+                with contextlib.suppress(Exception):
+                    await writer.close(abort=True)
+                raise
+            processed = writer.written
+            job.processed_files = processed
 
             try:
                 job.artifact_path = storage.storage_key_for(archive_path)
@@ -282,6 +417,25 @@ async def process_bulk_image_export(job_id: UUID) -> None:
             shutil.rmtree(job_dir, ignore_errors=True)
 
 
+def _remove_artifact(job_id: UUID, path: Path) -> None:
+    if not path.exists():
+        return
+    try:
+        if path.is_file():
+            path.unlink(missing_ok=True)
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+        parent = path.parent
+        if parent.name == job_id.hex:
+            shutil.rmtree(parent, ignore_errors=True)
+    except Exception as exc:  # pragma: no cover
+        logger.warning(
+            "cleanup_bulk_image_exports: failed to remove %s (%s)",
+            path,
+            exc,
+        )
+
+
 async def cleanup_bulk_image_exports() -> None:
     settings = get_settings()
     storage = PosixStorage.from_env()
@@ -290,51 +444,48 @@ async def cleanup_bulk_image_exports() -> None:
     )
     async with SessionLocal() as db:
         rows = (
-            (
-                await db.execute(
-                    select(models.BulkImageExport).where(
-                        models.BulkImageExport.finished_at.is_not(None),
-                        models.BulkImageExport.finished_at < cutoff,
-                        models.BulkImageExport.artifact_path.is_not(None),
-                    )
+            await db.execute(
+                select(
+                    models.BulkImageExport.id,
+                    models.BulkImageExport.artifact_path,
+                ).where(
+                    models.BulkImageExport.finished_at.is_not(None),
+                    models.BulkImageExport.finished_at < cutoff,
+                    models.BulkImageExport.artifact_path.is_not(None),
                 )
             )
-            .scalars()
-            .all()
-        )
+        ).all()
         cleaned: list[UUID] = []
-        for job in rows:
-            path: Path | None = None
-            if job.artifact_path:
+        removals: list[tuple[UUID, Path]] = []
+        for job_id, artifact_path in rows:
+            if artifact_path:
                 try:
-                    path = storage.path_from_key(job.artifact_path)
+                    removals.append((job_id, storage.path_from_key(artifact_path)))
                 except ValueError:
-                    path = None
                     logger.warning(
                         "cleanup_bulk_image_exports: invalid artifact path " "job=%s",
-                        job.id,
-                    )
-            if path and path.exists():
-                try:
-                    if path.is_file():
-                        path.unlink(missing_ok=True)
-                    else:
-                        shutil.rmtree(path, ignore_errors=True)
-                    parent = path.parent
-                    if parent.name == job.id.hex:
-                        shutil.rmtree(parent, ignore_errors=True)
-                except Exception as exc:  # pragma: no cover
-                    logger.warning(
-                        "cleanup_bulk_image_exports: failed to remove %s (%s)",
-                        path,
-                        exc,
+                        job_id,
                     )
-            job.artifact_path = None
-            job.artifact_filename = None
-            job.artifact_size = None
-            job.expires_at = datetime.now(timezone.utc)
-            cleaned.append(job.id)
+            cleaned.append(job_id)
+
+        limit = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+        async def _remove(job_id: UUID, path: Path) -> None:
+            async with limit:
+                await asyncio.to_thread(_remove_artifact, job_id, path)
+
+        await asyncio.gather(*(_remove(job_id, path) for job_id, path in removals))
         if cleaned:
+            await db.execute(
+                update(models.BulkImageExport)
+                .where(models.BulkImageExport.id.in_(cleaned))
+                .values(
+                    artifact_path=None,
+                    artifact_filename=None,
+                    artifact_size=None,
+                    expires_at=datetime.now(timezone.utc),
+                )
+            )
             await db.commit()
             logger.info(
                 "cleanup_bulk_image_exports: removed %d expired jobs",
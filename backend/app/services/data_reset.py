@@ -16,5 +16,9 @@ TABLE_DELETE_ORDER = [
 
 
 async def wipe_application_data(db: AsyncSession) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        # One statement covering every table; TRUNCATE skips the per-row scan.
+        await db.execute(text(f"TRUNCATE TABLE {', '.join(TABLE_DELETE_ORDER)}"))
+        return
     for table in TABLE_DELETE_ORDER:
         await db.execute(text(f"DELETE FROM {table}"))
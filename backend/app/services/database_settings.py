@@ -4,6 +4,8 @@ from pathlib import Path
 import os
 import shutil
 import tempfile
+import threading
+import time
 from typing import Tuple
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -26,6 +28,22 @@ _PROTECTED_WINDOWS_PREFIXES = [
     Path("C:/Program Files"),
     Path("C:/Program Files (x86)"),
 ]
+_PROTECTED_PARTS = frozenset(
+    prefix.parts
+    for prefix in (
+        *_PROTECTED_UNIX_PREFIXES,
+        *_PROTECTED_WINDOWS_PREFIXES,
+        Path(os.environ.get("SystemRoot", "C:/Windows")),
+    )
+)
+_PROTECTED_DEPTHS = frozenset(len(parts) for parts in _PROTECTED_PARTS)
+# Status endpoints poll validate_database_path; reuse a result for a short
+# while instead of re-probing the filesystem on every request.
+_VALIDATION_TTL_SECONDS = 1.0
+_validation_cache: dict[
+    tuple[str | Path, bool], tuple[float, DatabasePathStatus, str | None]
+] = {}
+_validation_lock = threading.Lock()
 
 
 def _default_database_path() -> Path:
@@ -34,12 +52,21 @@ def _default_database_path() -> Path:
     return (home / _DEFAULT_FILENAME).resolve()
 
 
+def _absolute_path(path: str | Path) -> Path:
+    # normpath is pure string work, good enough for the stored setting; the
+    # validation below resolves symlinks before checking protected folders.
+    expanded = os.path.expanduser(path)
+    if os.path.isabs(expanded):
+        return Path(os.path.normpath(expanded))
+    return Path(expanded).resolve(strict=False)
+
+
 def _normalize_path(path_value: str | None) -> Path | None:
     if not path_value:
         return None
     candidate = Path(path_value).expanduser()
     try:
-        return candidate.resolve(strict=False)
+        return _absolute_path(candidate)
     except FileNotFoundError:
         # When the path (or parent) does not exist yet we still want an
         # absolute Path
@@ -49,22 +76,8 @@ def _normalize_path(path_value: str | None) -> Path | None:
 
 
 def _is_protected(path: Path) -> bool:
-    prefixes = list(_PROTECTED_UNIX_PREFIXES)
-    prefixes.extend(_PROTECTED_WINDOWS_PREFIXES)
-    try:
-        system_root = Path(os.environ.get("SystemRoot", "C:/Windows"))
-        prefixes.append(system_root)
-    except Exception:
-        pass
-    for prefix in prefixes:
-        try:
-            if path == prefix:
-                return True
-            path.relative_to(prefix)
-            return True
-        except ValueError:
-            continue
-    return False
+    parts = path.parts
+    return any(parts[:depth] in _PROTECTED_PARTS for depth in _PROTECTED_DEPTHS)
 
 
 def _target_directory(target: Path) -> Path:
@@ -90,6 +103,29 @@ def _check_disk_space(directory: Path) -> Tuple[bool, str | None]:
 
 def validate_database_path(
     path_value: str | Path, *, ensure_writable: bool = False
+) -> Tuple[DatabasePathStatus, str | None]:
+    key = (path_value, ensure_writable)
+    now = time.monotonic()
+    with _validation_lock:
+        cached = _validation_cache.get(key)
+    if cached and now - cached[0] < _VALIDATION_TTL_SECONDS:
+        return cached[1], cached[2]
+    status, message = _validate_database_path(
+        path_value, ensure_writable=ensure_writable
+    )
+    with _validation_lock:
+        for stale in [
+            k
+            for k, entry in _validation_cache.items()
+            if now - entry[0] >= _VALIDATION_TTL_SECONDS
+        ]:
+            del _validation_cache[stale]
+        _validation_cache[key] = (now, status, message)
+    return status, message
+
+
+def _validate_database_path(
+    path_value: str | Path, *, ensure_writable: bool
 ) -> Tuple[DatabasePathStatus, str | None]:
     if isinstance(path_value, Path):
         path = path_value.expanduser().resolve(strict=False)
@@ -4,12 +4,12 @@ import logging
 from datetime import datetime, timezone
 from pathlib import Path
 
-from sqlalchemy import func, select, delete
+from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models
 from ..storage import PosixStorage
-from .links import link_asset_to_project
+from .links import link_asset_to_projects
 
 logger = logging.getLogger("arciva.dedup")
 
@@ -38,9 +38,19 @@ async def adopt_duplicate_asset(
         return
 
     ts = timestamp or datetime.now(timezone.utc)
+    # Only the columns the state templates need; plain rows skip hydrating
+    # two ORM objects per link.
     link_rows = (
         await db.execute(
-            select(models.ProjectAsset, models.MetadataState)
+            select(
+                models.ProjectAsset.project_id,
+                models.MetadataState.rating,
+                models.MetadataState.color_label,
+                models.MetadataState.picked,
+                models.MetadataState.rejected,
+                models.MetadataState.edits,
+                models.MetadataState.source_project_id,
+            )
             .outerjoin(
                 models.MetadataState,
                 models.MetadataState.link_id == models.ProjectAsset.id,
@@ -52,17 +62,13 @@ async def adopt_duplicate_asset(
         )
     ).all()
 
-    linked = 0
-    for link, metadata in link_rows:
-        _, created = await link_asset_to_project(
-            db,
-            project_id=link.project_id,
-            asset=existing_asset,
-            user_id=existing_asset.user_id,
-            metadata_template=metadata,
-        )
-        if created:
-            linked += 1
+    created = await link_asset_to_projects(
+        db,
+        asset=existing_asset,
+        user_id=existing_asset.user_id,
+        templates={row.project_id: row for row in link_rows},
+    )
+    linked = len(created)
 
     await db.execute(
         delete(models.ProjectAsset).where(
@@ -71,17 +77,9 @@ async def adopt_duplicate_asset(
     )
     await db.execute(delete(models.Asset).where(models.Asset.id == duplicate_asset.id))
 
-    count = (
-        await db.execute(
-            select(func.count())
-            .select_from(models.ProjectAsset)
-            .where(
-                models.ProjectAsset.asset_id == existing_asset.id,
-                models.ProjectAsset.user_id == existing_asset.user_id,
-            )
-        )
-    ).scalar_one()
-    existing_asset.reference_count = max(int(count), 1)
+    # reference_count tracks the asset's project links; the duplicate's links
+    # lived on another asset id, so only the newly created ones add to it.
+    existing_asset.reference_count = max(existing_asset.reference_count + linked, 1)
     existing_asset.completed_at = existing_asset.completed_at or ts
     existing_asset.status = models.AssetStatus.READY
 
@@ -90,7 +88,7 @@ async def adopt_duplicate_asset(
     if duplicate_asset.storage_uri:
         storage.remove_original(duplicate_asset.storage_uri)
     if duplicate_asset.sha256:
-        storage.remove_derivatives(duplicate_asset.sha256)
+        await storage.remove_derivatives_async(duplicate_asset.sha256)
 
     await db.commit()
     logger.info(
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+import io
 import logging
 import math
+import os
 import re
 import shutil
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path
 from uuid import UUID
 
-from PIL import Image, ImageDraw, ImageFont, ImageOps
-from sqlalchemy import select
+from PIL import ExifTags, Image, ImageDraw, ImageFont, ImageOps
+from sqlalchemy import null, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
@@ -21,9 +25,22 @@ from ..storage import PosixStorage
 
 logger = logging.getLogger("arciva.exports")
 
+# Progress is committed every N rendered files or every few seconds.
+PROGRESS_BATCH_SIZE = 16
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+CONTACT_SHEET_TILE_SIZE = 320
+SHEET_BACKGROUND = "#F8F5F0"
+SHEET_TEXT = "#1F1E1B"
+_SLUG_RE = re.compile(r"[^a-zA-Z0-9]+")
+# Output formats that are already compressed and gain nothing from DEFLATE.
+STORED_SUFFIXES = frozenset(
+    {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".webp", ".heic", ".pdf"}
+)
+
 
 def _slugify(value: str) -> str:
-    normalized = re.sub(r"[^a-zA-Z0-9]+", "-", value).strip("-").lower()
+    normalized = _SLUG_RE.sub("-", value).strip("-").lower()
     return normalized or "export"
 
 
@@ -43,32 +60,59 @@ def _contact_sheet_extension(fmt: schemas.ExportContactSheetFormat) -> str:
     return ".jpg"
 
 
-def _generate_file_name(base: str, ext: str, used: set[str]) -> str:
-    candidate = f"{base}{ext}"
-    counter = 1
+def _generate_file_name(
+    base: str, ext: str, used: set[str], counters: dict[str, int]
+) -> str:
+    # ``counters`` remembers the next suffix per name so repeated bases do not
+    # re-probe every earlier suffix; ``used`` still guards names like "a-1"
+    # that were taken by a different base.
+    key = f"{base}{ext}"
+    counter = counters.get(key, 0)
+    candidate = key if counter == 0 else f"{base}-{counter}{ext}"
     while candidate in used:
-        candidate = f"{base}-{counter}{ext}"
         counter += 1
+        candidate = f"{base}-{counter}{ext}"
+    counters[key] = counter + 1
     used.add(candidate)
     return candidate
 
 
 def _render_image(
     source_path: Path,
-    dest_path: Path,
     settings: schemas.ExportJobSettings,
-) -> None:
-    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    tile_size: int | None = None,
+) -> tuple[bytes, Image.Image | None]:
+    """Render one export in memory.
+
+    Returns the encoded file and, when ``tile_size`` is given, a contact sheet
+    tile cut from the same decoded image so the sheet needs no second decode.
+    """
+    buffer = io.BytesIO()
+    tile = None
     try:
-        with Image.open(source_path) as im:
-            im = ImageOps.exif_transpose(im)
-            if settings.output_format == schemas.ExportOutputFormat.JPEG:
-                im = im.convert("RGB")
+        with open(source_path, "rb") as fh, Image.open(fh) as im:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            long_edge = (
+                settings.long_edge
+                if settings.size_mode == schemas.ExportSizeMode.RESIZE
+                else None
+            )
+            scale = long_edge / max(im.size) if long_edge else 1.0
+            if scale < 0.5:
+                # Shrink-on-load for JPEG sources; keep a 2x margin (Pillow's
+                # default reducing_gap) so LANCZOS still does the final pass.
+                width, height = im.size
+                im.draft(None, (int(width * scale * 2), int(height * scale * 2)))
+            # Both calls return a full copy even when there is nothing to do.
+            if im.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+                im = ImageOps.exif_transpose(im)
             if (
-                settings.size_mode == schemas.ExportSizeMode.RESIZE
-                and settings.long_edge
+                settings.output_format == schemas.ExportOutputFormat.JPEG
+                and im.mode != "RGB"
             ):
-                long_edge = settings.long_edge
+                im = im.convert("RGB")
+            if long_edge:
                 resampling = getattr(Image, "Resampling", Image)
                 im.thumbnail((long_edge, long_edge), resampling.LANCZOS)
             save_kwargs: dict[str, object] = {}
@@ -79,57 +123,199 @@ def _render_image(
                 save_kwargs["subsampling"] = 0
             elif settings.output_format == schemas.ExportOutputFormat.TIFF:
                 save_kwargs["compression"] = "tiff_deflate"
-            im.save(dest_path, format=target_format, **save_kwargs)
+            im.save(buffer, format=target_format, **save_kwargs)
+            if tile_size:
+                tile = im.convert("RGB")
+                tile.thumbnail((tile_size, tile_size))
     except Exception as exc:  # pragma: no cover - fallback to raw copy
-        logger.warning(
-            "Falling back to byte copy for %s -> %s (%s)",
-            source_path,
-            dest_path,
-            exc,
-        )
-        shutil.copy2(source_path, dest_path)
+        logger.warning("Falling back to byte copy for %s (%s)", source_path, exc)
+        return source_path.read_bytes(), None
+    return buffer.getvalue(), tile
+
+
+def _prefetch_sources(paths: list[Path]) -> None:
+    """Ask the kernel to start reading the given sources ahead of the renders."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+@lru_cache(maxsize=1)
+def _default_font() -> ImageFont.ImageFont | ImageFont.FreeTypeFont:
+    return ImageFont.load_default()
 
 
 def _build_contact_sheet(
-    image_paths: list[Path],
-    dest_path: Path,
+    tiles: list[tuple[str, Image.Image | None]],
     fmt: schemas.ExportContactSheetFormat,
-) -> None:
-    if not image_paths:
-        return
-    thumb_size = 320
-    columns = min(5, max(1, len(image_paths)))
-    rows = math.ceil(len(image_paths) / columns)
+) -> bytes | None:
+    if not tiles:
+        return None
+    thumb_size = CONTACT_SHEET_TILE_SIZE
+    columns = min(5, max(1, len(tiles)))
+    rows = math.ceil(len(tiles) / columns)
     tile_height = thumb_size + 48
     sheet_width = columns * (thumb_size + 20) + 20
     sheet_height = rows * tile_height + 40
-    sheet = Image.new("RGB", (sheet_width, sheet_height), color="#F8F5F0")
+    sheet = Image.new("RGB", (sheet_width, sheet_height), color=SHEET_BACKGROUND)
     draw = ImageDraw.Draw(sheet)
-    font = ImageFont.load_default()
+    font = _default_font()
 
-    for index, path in enumerate(image_paths):
+    for index, (filename, im) in enumerate(tiles):
         col = index % columns
         row = index // columns
         x = 20 + col * (thumb_size + 20)
         y = 20 + row * tile_height
-        try:
-            with Image.open(path) as im:
-                im = ImageOps.exif_transpose(im).convert("RGB")
-                im.thumbnail((thumb_size, thumb_size))
-                paste_x = x + (thumb_size - im.width) // 2
-                paste_y = y
-                sheet.paste(im, (paste_x, paste_y))
-        except Exception as exc:  # pragma: no cover - best effort
-            logger.warning("contact sheet: failed to load %s (%s)", path, exc)
-        filename = path.name
-        draw.text((x, y + thumb_size + 8), filename[:64], fill="#1F1E1B", font=font)
+        if im is not None:
+            paste_x = x + (thumb_size - im.width) // 2
+            paste_y = y
+            sheet.paste(im, (paste_x, paste_y))
+        draw.text((x, y + thumb_size + 8), filename[:64], fill=SHEET_TEXT, font=font)
 
-    dest_path.parent.mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
     if fmt == schemas.ExportContactSheetFormat.PDF:
         sheet_rgb = sheet.convert("RGB")
-        sheet_rgb.save(dest_path, format="PDF")
+        sheet_rgb.save(buffer, format="PDF")
     else:
-        sheet.save(dest_path, format=fmt.value)
+        sheet.save(buffer, format=fmt.value)
+    return buffer.getvalue()
+
+
+def _compress_type(member: str) -> int:
+    # Rendered images are already entropy-coded; DEFLATE only burns a core.
+    if os.path.splitext(member)[1].lower() in STORED_SUFFIXES:
+        return zipfile.ZIP_STORED
+    return zipfile.ZIP_DEFLATED
+
+
+def _write_member(zf: zipfile.ZipFile, member: str, data: bytes) -> None:
+    zf.writestr(member, data, compress_type=_compress_type(member))
+
+
+@lru_cache(maxsize=1)
+def _render_pool() -> ThreadPoolExecutor:
+    """Return the render pool shared by all export jobs in this process.
+
+    Pillow releases the GIL while decoding, resizing and encoding, so threads
+    scale with the available cores without pickling settings into worker
+    processes. The pool is created once, with Pillow's format plugins
+    registered up front, so neither cost lands on a job.
+    """
+    Image.init()
+    return ThreadPoolExecutor(
+        max_workers=os.cpu_count() or 1, thread_name_prefix="export-render"
+    )
+
+
+async def _report_progress(
+    db: AsyncSession, job: models.ExportJob, done: int, total: int
+) -> None:
+    # Skip the ORM flush of the whole job row; the evaluated UPDATE also
+    # refreshes the in-session job.
+    await db.execute(
+        update(models.ExportJob)
+        .where(models.ExportJob.id == job.id)
+        .values(
+            exported_files=done,
+            progress=min(90, int((done / max(total, 1)) * 90)),
+        )
+    )
+    await db.commit()
+
+
+async def _render_images(
+    db: AsyncSession,
+    job: models.ExportJob,
+    zf: zipfile.ZipFile,
+    renders: list[tuple[Path, str]],
+    settings: schemas.ExportJobSettings,
+) -> list[Image.Image | None]:
+    """Render all images in parallel straight into the archive.
+
+    Progress is committed in batches. Returns the contact sheet tiles in
+    selection order when the sheet is enabled, otherwise an empty list.
+    """
+    total = len(renders)
+    tile_size = CONTACT_SHEET_TILE_SIZE if settings.contact_sheet_enabled else None
+    loop = asyncio.get_running_loop()
+    executor = _render_pool()
+    # At most this many renders of the job are queued or finished-but-unwritten
+    # at once, which bounds memory and leaves room in the shared pool for
+    # other jobs.
+    window = 2 * (os.cpu_count() or 1)
+    futures: dict[asyncio.Future, int] = {}
+    submitted = 0
+    prefetched = 0
+
+    async def _prefetch_ahead() -> None:
+        # Readahead is asynchronous in the kernel, so the next window of
+        # sources loads while the current renders are busy on the CPU. Only a
+        # window is hinted: pages read far ahead of a large job would be
+        # evicted (and read twice) before the renders reach them.
+        nonlocal prefetched
+        end = min(total, submitted + window)
+        if end > prefetched:
+            sources = [source for source, _ in renders[prefetched:end]]
+            await asyncio.to_thread(_prefetch_sources, sources)
+            prefetched = end
+
+    def _submit_next() -> None:
+        nonlocal submitted
+        future = loop.run_in_executor(
+            executor, _render_image, renders[submitted][0], settings, tile_size
+        )
+        futures[future] = submitted
+        submitted += 1
+
+    tiles: list[Image.Image | None] = [None] * total if tile_size else []
+    try:
+        await _prefetch_ahead()
+        while submitted < total and len(futures) < window:
+            _submit_next()
+        await _prefetch_ahead()
+        done = 0
+        reported = 0
+        last_report = loop.time()
+        while futures:
+            finished, _ = await asyncio.wait(
+                futures, return_when=asyncio.FIRST_COMPLETED
+            )
+            for future in finished:
+                # A finished future keeps its encoded bytes alive; release it
+                # once written so only the small sheet tiles outlive a render.
+                index = futures.pop(future)
+                data, tile = future.result()
+                if tile_size:
+                    tiles[index] = tile
+                await asyncio.to_thread(_write_member, zf, renders[index][1], data)
+                del data
+                done += 1
+                if submitted < total:
+                    _submit_next()
+            del finished
+            await _prefetch_ahead()
+            now = loop.time()
+            if (
+                done - reported >= PROGRESS_BATCH_SIZE
+                or now - last_report >= PROGRESS_INTERVAL_SECONDS
+                or done == total
+            ):
+                reported = done
+                last_report = now
+                await _report_progress(db, job, done, total)
+    finally:
+        # Drop this job's queued renders; the pool itself is shared.
+        for future in futures:
+            future.cancel()
+    return tiles
 
 
 async def _load_assets_for_job(
@@ -138,47 +324,58 @@ async def _load_assets_for_job(
     settings: schemas.ExportJobSettings,
 ) -> tuple[dict[UUID, models.Asset], list[UUID]]:
     photo_ids = [UUID(value) for value in job.photo_ids]
-    wanted_ids: set[UUID] = set(photo_ids)
-    raw_to_jpeg: dict[UUID, UUID] = {}
+    stmt = select(models.Asset).join(
+        models.ProjectAsset,
+        models.ProjectAsset.asset_id == models.Asset.id,
+    )
     if settings.raw_handling == schemas.ExportRawStrategy.DEVELOPED and photo_ids:
-        pair_rows = (
-            (
-                await db.execute(
-                    select(models.ProjectAssetPair).where(
-                        models.ProjectAssetPair.project_id == job.project_id,
-                        models.ProjectAssetPair.raw_asset_id.in_(photo_ids),
+        # Pick up each selected RAW's developed JPEG in the same round-trip.
+        # Every row carries its own pair's JPEG id, so a RAW whose JPEG row is
+        # gone (unlinked or deleted) is still reported as missing below.
+        pairs = models.ProjectAssetPair
+        paired_jpeg_id = (
+            select(pairs.jpeg_asset_id)
+            .where(
+                pairs.project_id == job.project_id,
+                pairs.raw_asset_id == models.Asset.id,
+            )
+            .scalar_subquery()
+        )
+        stmt = stmt.add_columns(paired_jpeg_id).where(
+            or_(
+                models.Asset.id.in_(photo_ids),
+                models.Asset.id.in_(
+                    select(pairs.jpeg_asset_id).where(
+                        pairs.project_id == job.project_id,
+                        pairs.raw_asset_id.in_(photo_ids),
                     )
-                )
+                ),
             )
-            .scalars()
-            .all()
         )
-        for pair in pair_rows:
-            raw_to_jpeg[pair.raw_asset_id] = pair.jpeg_asset_id
-            wanted_ids.add(pair.jpeg_asset_id)
-
+    else:
+        stmt = stmt.add_columns(null()).where(models.Asset.id.in_(photo_ids))
     rows = (
-        (
-            await db.execute(
-                select(models.Asset)
-                .join(
-                    models.ProjectAsset,
-                    models.ProjectAsset.asset_id == models.Asset.id,
-                )
-                .where(
-                    models.ProjectAsset.project_id == job.project_id,
-                    models.Asset.id.in_(wanted_ids),
-                    models.ProjectAsset.user_id == job.user_id,
-                    models.Asset.user_id == job.user_id,
-                )
+        await db.execute(
+            stmt.where(
+                models.ProjectAsset.project_id == job.project_id,
+                models.ProjectAsset.user_id == job.user_id,
+                models.Asset.user_id == job.user_id,
             )
         )
-        .scalars()
-        .all()
-    )
-    asset_map: dict[UUID, models.Asset] = {asset.id: asset for asset in rows}
-
-    missing = [asset_id for asset_id in wanted_ids if asset_id not in asset_map]
+    ).all()
+    wanted_ids = set(photo_ids)
+    asset_map: dict[UUID, models.Asset] = {}
+    raw_to_jpeg: dict[UUID, UUID] = {}
+    for asset, jpeg_asset_id in rows:
+        asset_map[asset.id] = asset
+        if jpeg_asset_id is not None and asset.id in wanted_ids:
+            raw_to_jpeg[asset.id] = jpeg_asset_id
+
+    missing = [
+        asset_id
+        for asset_id in [*photo_ids, *raw_to_jpeg.values()]
+        if asset_id not in asset_map
+    ]
     if missing:
         raise RuntimeError(f"Missing assets for export job {job.id}: {missing}")
 
@@ -226,16 +423,18 @@ async def process_export_job(job_id: UUID) -> None:
         await db.commit()
 
         job_dir = Path(settings_obj.fs_exports_dir) / job.id.hex
-        files_dir = job_dir / "files"
         shutil.rmtree(job_dir, ignore_errors=True)
-        files_dir.mkdir(parents=True, exist_ok=True)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        slug = _slugify(project.title or "project")
+        archive_name = f"{slug}-{job.id.hex[:8]}.zip"
+        archive_path = job_dir / archive_name
 
-        exported_paths: list[Path] = []
         used_names: set[str] = set()
-        total = len(resolved_ids)
+        name_counters: dict[str, int] = {}
 
         try:
-            for index, asset_id in enumerate(resolved_ids, start=1):
+            renders: list[tuple[Path, str]] = []
+            for asset_id in resolved_ids:
                 asset = asset_map.get(asset_id)
                 if not asset or not asset.storage_uri:
                     raise RuntimeError(f"Asset {asset_id} missing storage path")
@@ -256,33 +455,27 @@ async def process_export_job(job_id: UUID) -> None:
                     safe_base,
                     _output_extension(settings.output_format),
                     used_names,
+                    name_counters,
                 )
-                dest_path = files_dir / dest_name
-                await asyncio.to_thread(_render_image, source_path, dest_path, settings)
-                exported_paths.append(dest_path)
-
-                job.exported_files = index
-                job.progress = min(90, int((index / max(total, 1)) * 90))
-                await db.commit()
-
-            if settings.contact_sheet_enabled:
-                sheet_ext = _contact_sheet_extension(settings.contact_sheet_format)
-                sheet_name = _generate_file_name("contact-sheet", sheet_ext, used_names)
-                sheet_path = files_dir / sheet_name
-                await asyncio.to_thread(
-                    _build_contact_sheet,
-                    exported_paths,
-                    sheet_path,
-                    settings.contact_sheet_format,
-                )
-                if sheet_path.exists():
-                    exported_paths.append(sheet_path)
+                renders.append((source_path, dest_name))
+
+            # Renders are written straight into the archive; nothing is staged
+            # on disk and read back.
+            with zipfile.ZipFile(archive_path, "w") as zf:
+                tiles = await _render_images(db, job, zf, renders, settings)
 
-            slug = _slugify(project.title or "project")
-            archive_name = f"{slug}-{job.id.hex[:8]}.zip"
-            archive_path = job_dir / archive_name
-            await asyncio.to_thread(_make_zip_archive, files_dir, archive_path)
-            shutil.rmtree(files_dir, ignore_errors=True)
+                if settings.contact_sheet_enabled:
+                    sheet_ext = _contact_sheet_extension(settings.contact_sheet_format)
+                    sheet_name = _generate_file_name(
+                        "contact-sheet", sheet_ext, used_names, name_counters
+                    )
+                    sheet = await asyncio.to_thread(
+                        _build_contact_sheet,
+                        [(name, tile) for (_, name), tile in zip(renders, tiles)],
+                        settings.contact_sheet_format,
+                    )
+                    if sheet is not None:
+                        await asyncio.to_thread(_write_member, zf, sheet_name, sheet)
 
             try:
                 job.artifact_path = storage.storage_key_for(archive_path)
@@ -310,14 +503,6 @@ async def process_export_job(job_id: UUID) -> None:
             shutil.rmtree(job_dir, ignore_errors=True)
 
 
-def _make_zip_archive(source_dir: Path, archive_path: Path) -> None:
-    archive_path.parent.mkdir(parents=True, exist_ok=True)
-    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for path in source_dir.rglob("*"):
-            if path.is_file():
-                zf.write(path, path.relative_to(source_dir))
-
-
 async def cleanup_export_jobs() -> None:
     settings = get_settings()
     storage = PosixStorage.from_env()
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import uuid
-from typing import Tuple
+from typing import Mapping, Tuple
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models
-from .metadata_states import ensure_state_for_link
+from .metadata_states import build_state_for_link, ensure_state_for_link
 
 
 async def link_asset_to_project(
@@ -42,3 +42,49 @@ async def link_asset_to_project(
         source_project_id=source_project_id,
     )
     return link, True
+
+
+async def link_asset_to_projects(
+    db: AsyncSession,
+    *,
+    asset: models.Asset,
+    user_id: uuid.UUID,
+    templates: Mapping[uuid.UUID, models.MetadataState | None],
+) -> list[models.ProjectAsset]:
+    """Link ``asset`` into every project in ``templates`` in one batch.
+
+    ``templates`` maps project ids to the metadata state (or a row with the
+    same fields) to copy onto the new link. Projects that already contain the
+    asset are skipped; the newly created links are returned.
+    """
+    if not templates:
+        return []
+    already_linked = set(
+        (
+            await db.execute(
+                select(models.ProjectAsset.project_id).where(
+                    models.ProjectAsset.asset_id == asset.id,
+                    models.ProjectAsset.project_id.in_(list(templates)),
+                )
+            )
+        )
+        .scalars()
+        .all()
+    )
+    links = [
+        models.ProjectAsset(project_id=project_id, asset_id=asset.id, user_id=user_id)
+        for project_id in templates
+        if project_id not in already_linked
+    ]
+    if not links:
+        return []
+    db.add_all(links)
+    await db.flush()
+    db.add_all(
+        [
+            build_state_for_link(link, template=templates[link.project_id])
+            for link in links
+        ]
+    )
+    await db.flush()
+    return links
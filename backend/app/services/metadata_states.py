@@ -4,10 +4,16 @@ import uuid
 from typing import Iterable
 
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models
 
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
 
 def _coerce_color_label(
     value: models.ColorLabel | str | None,
@@ -45,10 +51,50 @@ async def ensure_state_for_link(
     template: models.MetadataState | None = None,
     source_project_id: uuid.UUID | None = None,
 ) -> models.MetadataState:
-    existing = await get_state_for_link(db, link.id)
-    if existing:
-        return existing
+    state = build_state_for_link(
+        link, template=template, source_project_id=source_project_id
+    )
+    dialect = db.get_bind().dialect.name
+    if dialect not in _UPSERT_INSERTS:
+        existing = await get_state_for_link(db, link.id)
+        if existing:
+            return existing
+        db.add(state)
+        await db.flush()
+        return state
 
+    # Callers reach this on a miss, so try the INSERT first and only look the
+    # row up when a concurrent request created it.
+    stmt = (
+        _UPSERT_INSERTS[dialect](models.MetadataState)
+        .values(
+            link_id=state.link_id,
+            rating=state.rating,
+            color_label=state.color_label,
+            picked=state.picked,
+            rejected=state.rejected,
+            edits=state.edits,
+            source_project_id=state.source_project_id,
+        )
+        .on_conflict_do_nothing(index_elements=["link_id"])
+        .returning(models.MetadataState)
+    )
+    created = (await db.execute(stmt)).scalar_one_or_none()
+    if created is not None:
+        return created
+    return (
+        await db.execute(
+            select(models.MetadataState).where(models.MetadataState.link_id == link.id)
+        )
+    ).scalar_one()
+
+
+def build_state_for_link(
+    link: models.ProjectAsset,
+    *,
+    template: models.MetadataState | None = None,
+    source_project_id: uuid.UUID | None = None,
+) -> models.MetadataState:
     color_label = _coerce_color_label(template.color_label if template else None)
     rating = _clamp_rating(getattr(template, "rating", None))
     picked = bool(getattr(template, "picked", False)) if template else False
@@ -56,7 +102,7 @@ async def ensure_state_for_link(
     edits = getattr(template, "edits", None) if template else None
     inherit_source = source_project_id or getattr(template, "source_project_id", None)
 
-    state = models.MetadataState(
+    return models.MetadataState(
         link_id=link.id,
         rating=rating,
         color_label=color_label,
@@ -65,16 +111,13 @@ async def ensure_state_for_link(
         edits=edits,
         source_project_id=inherit_source,
     )
-    db.add(state)
-    await db.flush()
-    return state
 
 
 async def ensure_states_for_links(
     db: AsyncSession,
     links: Iterable[models.ProjectAsset],
 ) -> dict[uuid.UUID, models.MetadataState]:
-    link_ids = [link.id for link in links]
+    link_ids = list(dict.fromkeys(link.id for link in links))
     if not link_ids:
         return {}
     rows = (
@@ -89,10 +132,13 @@ async def ensure_states_for_links(
         .all()
     )
     by_id = {row.link_id: row for row in rows}
-    missing = [link for link in links if link.id not in by_id]
-    for link in missing:
-        state = models.MetadataState(link_id=link.id)
-        db.add(state)
+    missing = [
+        models.MetadataState(link_id=link_id)
+        for link_id in link_ids
+        if link_id not in by_id
+    ]
+    if missing:
+        db.add_all(missing)
         await db.flush()
-        by_id[link.id] = state
+        by_id.update((state.link_id, state) for state in missing)
     return by_id
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import logging
-from pathlib import Path
-from typing import Dict, List, Tuple
-from uuid import UUID
+import os
+from collections import OrderedDict, defaultdict
+from typing import DefaultDict, Dict, List, Sequence, Tuple
+from uuid import UUID, uuid4
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -13,23 +14,49 @@ from ..constants import JPEG_EXTENSIONS, RAW_EXTENSIONS
 
 logger = logging.getLogger("arciva.pairing")
 
+SYNCED_CACHE_SIZE = 1_024
 
-def _normalize_basename(filename: str | None) -> str | None:
-    if not filename:
-        return None
-    stem = Path(filename).stem
-    return stem.strip() or None
+# Fingerprint of each project's links as the last sync left them; a rescan
+# that finds the same links has nothing to do and skips the pairs SELECT.
+_synced_fingerprints: OrderedDict[UUID, int] = OrderedDict()
+
+
+def _links_fingerprint(
+    rows: Sequence[Tuple[models.ProjectAsset, models.Asset]],
+) -> int:
+    return hash(
+        frozenset(
+            (link.asset_id, link.pair_id, asset.original_filename)
+            for link, asset in rows
+        )
+    )
 
 
-def _extension_kind(filename: str | None) -> str | None:
+def _remember_synced(
+    project_id: UUID, rows: Sequence[Tuple[models.ProjectAsset, models.Asset]]
+) -> None:
+    _synced_fingerprints[project_id] = _links_fingerprint(rows)
+    _synced_fingerprints.move_to_end(project_id)
+    while len(_synced_fingerprints) > SYNCED_CACHE_SIZE:
+        _synced_fingerprints.popitem(last=False)
+
+
+def _pairing_key(filename: str | None) -> Tuple[str | None, str | None]:
+    """Return ``(basename, kind)`` for a filename with one splitext call.
+
+    ``kind`` is ``"jpeg"``, ``"raw"`` or ``None`` for other extensions.
+    """
     if not filename:
-        return None
-    ext = Path(filename).suffix.lower()
+        return None, None
+    stem, ext = os.path.splitext(os.path.basename(filename))
+    ext = ext.lower()
     if ext in JPEG_EXTENSIONS:
-        return "jpeg"
-    if ext in RAW_EXTENSIONS:
-        return "raw"
-    return None
+        kind = "jpeg"
+    elif ext in RAW_EXTENSIONS:
+        kind = "raw"
+    else:
+        return None, None
+    return stem.strip() or None, kind
 
 
 async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
@@ -40,20 +67,25 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
             .where(models.ProjectAsset.project_id == project_id)
         )
     ).all()
+    if _synced_fingerprints.get(project_id) == _links_fingerprint(rows):
+        return
 
-    buckets: Dict[str, Dict[str, List[Tuple[models.ProjectAsset, models.Asset]]]] = {}
+    # Per basename: (jpeg items, raw items).
+    buckets: DefaultDict[
+        str,
+        Tuple[
+            List[Tuple[models.ProjectAsset, models.Asset]],
+            List[Tuple[models.ProjectAsset, models.Asset]],
+        ],
+    ] = defaultdict(lambda: ([], []))
     display_names: Dict[str, str] = {}
 
     for link, asset in rows:
-        kind = _extension_kind(asset.original_filename)
-        if not kind:
-            continue
-        base = _normalize_basename(asset.original_filename)
-        if not base:
+        base, kind = _pairing_key(asset.original_filename)
+        if not kind or not base:
             continue
         key = base.lower()
-        bucket = buckets.setdefault(key, {"jpeg": [], "raw": []})
-        bucket[kind].append((link, asset))
+        buckets[key][0 if kind == "jpeg" else 1].append((link, asset))
         display_names.setdefault(key, base)
 
     targets: Dict[
@@ -63,9 +95,7 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
             Tuple[models.ProjectAsset, models.Asset],
         ],
     ] = {}
-    for key, bucket in buckets.items():
-        jpeg_items = bucket["jpeg"]
-        raw_items = bucket["raw"]
+    for key, (jpeg_items, raw_items) in buckets.items():
         if len(jpeg_items) == 1 and len(raw_items) == 1:
             targets[key] = (jpeg_items[0], raw_items[0])
         elif len(jpeg_items) > 1 or len(raw_items) > 1:
@@ -77,30 +107,8 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
                 len(raw_items),
             )
 
-    if not targets:
-        # Clear stale pair references if necessary.
-        existing_pairs = (
-            (
-                await db.execute(
-                    select(models.ProjectAssetPair).where(
-                        models.ProjectAssetPair.project_id == project_id
-                    )
-                )
-            )
-            .scalars()
-            .all()
-        )
-        if not existing_pairs:
-            return
-        for pair in existing_pairs:
-            for link, _ in rows:
-                if link.pair_id == pair.id:
-                    link.pair_id = None
-        for pair in existing_pairs:
-            await db.delete(pair)
-        await db.commit()
-        return
-
+    # Fetched once for both branches below. The two SELECTs cannot be gathered:
+    # an AsyncSession runs one statement at a time on its connection.
     existing_pairs = (
         (
             await db.execute(
@@ -112,14 +120,33 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
         .scalars()
         .all()
     )
+
+    if not targets:
+        # Clear stale pair references if necessary.
+        if not existing_pairs:
+            _remember_synced(project_id, rows)
+            return
+        stale_pair_ids = {pair.id for pair in existing_pairs}
+        for link, _ in rows:
+            if link.pair_id in stale_pair_ids:
+                link.pair_id = None
+        for pair in existing_pairs:
+            await db.delete(pair)
+        await db.commit()
+        _remember_synced(project_id, rows)
+        return
+
     existing_by_key = {pair.basename.lower(): pair for pair in existing_pairs}
-    existing_by_asset: Dict[UUID, models.ProjectAssetPair] = {}
-    for pair in existing_pairs:
-        existing_by_asset[pair.jpeg_asset_id] = pair
-        existing_by_asset[pair.raw_asset_id] = pair
+    existing_by_asset: Dict[UUID, models.ProjectAssetPair] = {
+        asset_id: pair
+        for pair in existing_pairs
+        for asset_id in (pair.jpeg_asset_id, pair.raw_asset_id)
+    }
 
     asset_pair_map: Dict[UUID, UUID] = {}
     seen_pair_ids: set[UUID] = set()
+    link_targets: List[Tuple[models.ProjectAsset, UUID]] = []
+    new_pairs = False
     changed = False
 
     for key, (
@@ -138,14 +165,17 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
             jpeg_asset.original_filename or raw_asset.original_filename or key,
         )
         if pair is None:
+            # The id is assigned here so links can reference it before the
+            # single flush below.
             pair = models.ProjectAssetPair(
+                id=uuid4(),
                 project_id=project_id,
                 basename=basename,
                 jpeg_asset_id=jpeg_asset.id,
                 raw_asset_id=raw_asset.id,
             )
             db.add(pair)
-            await db.flush()
+            new_pairs = True
             existing_by_key[key] = pair
             existing_by_asset[jpeg_asset.id] = pair
             existing_by_asset[raw_asset.id] = pair
@@ -175,11 +205,16 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
         asset_pair_map[raw_asset.id] = pair.id
         seen_pair_ids.add(pair.id)
 
-        if jpeg_link.pair_id != pair.id:
-            jpeg_link.pair_id = pair.id
-            changed = True
-        if raw_link.pair_id != pair.id:
-            raw_link.pair_id = pair.id
+        link_targets.append((jpeg_link, pair.id))
+        link_targets.append((raw_link, pair.id))
+
+    # Without relationships the unit of work does not order pair INSERTs
+    # ahead of link UPDATEs, so flush new pairs before links point at them.
+    if new_pairs:
+        await db.flush()
+    for link, pair_id in link_targets:
+        if link.pair_id != pair_id:
+            link.pair_id = pair_id
             changed = True
 
     for link, _ in rows:
@@ -194,3 +229,4 @@ async def sync_project_pairs(db: AsyncSession, project_id: UUID) -> None:
 
     if changed:
         await db.commit()
+    _remember_synced(project_id, rows)
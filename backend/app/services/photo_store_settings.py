@@ -1,15 +1,25 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Literal, Sequence
+import asyncio
 import json
 import logging
 import os
 import shutil
+import sys
 import uuid
-import copy
+
+import orjson
+
+from ..storage import PosixStorage
+
+try:  # pragma: no cover - not available on Windows
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
 
 logger = logging.getLogger("arciva.photo_store")
 
@@ -22,6 +32,9 @@ PHOTO_SUBDIRS: tuple[str, ...] = (
 CONFIG_DIR = Path.home() / "Arciva"
 CONFIG_FILE = CONFIG_DIR / "photo_store_state.json"
 
+# ioctl(FICLONE): share the source extents on btrfs/XFS instead of copying.
+_FICLONE = 0x40049409
+
 PhotoStoreMode = Literal["move", "fresh", "add", "load"]
 PhotoStoreLocationRole = Literal["primary", "secondary"]
 PhotoStoreStatus = Literal["available", "missing", "not_writable"]
@@ -34,6 +47,15 @@ class StoredLocation:
     role: PhotoStoreLocationRole
     created_at: str
 
+    def to_dict(self) -> dict[str, str]:
+        # Plain field copy; dataclasses.asdict deep-copies every value.
+        return {
+            "id": self.id,
+            "path": self.path,
+            "role": self.role,
+            "created_at": self.created_at,
+        }
+
 
 @dataclass
 class PhotoStoreState:
@@ -41,6 +63,13 @@ class PhotoStoreState:
     last_option: PhotoStoreMode | None = None
     updated_at: str | None = None
 
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "locations": [loc.to_dict() for loc in self.locations],
+            "last_option": self.last_option,
+            "updated_at": self.updated_at,
+        }
+
 
 def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -68,9 +97,27 @@ def normalize_photo_store_path(candidate: str) -> Path | None:
     return _normalize_path(candidate)
 
 
+# Last parsed state file, keyed by (path, mtime_ns, size).
+_state_cache: tuple[tuple[Path, int, int], PhotoStoreState] | None = None
+
+
+def _cached_copy(state: PhotoStoreState) -> PhotoStoreState:
+    # Callers reassign ``locations`` but never edit a StoredLocation in place,
+    # so a fresh list is enough to keep the cached state intact.
+    return replace(state, locations=list(state.locations))
+
+
 def _read_state_file(default_root: Path) -> PhotoStoreState:
+    global _state_cache
     _ensure_config_dir()
-    if CONFIG_FILE.exists():
+    try:
+        stat = CONFIG_FILE.stat()
+    except FileNotFoundError:
+        stat = None
+    if stat is not None:
+        cache_key = (CONFIG_FILE, stat.st_mtime_ns, stat.st_size)
+        if _state_cache is not None and _state_cache[0] == cache_key:
+            return _cached_copy(_state_cache[1])
         try:
             data = json.loads(CONFIG_FILE.read_text())
             raw_locations = data.get("locations")
@@ -117,11 +164,13 @@ def _read_state_file(default_root: Path) -> PhotoStoreState:
                     else None
                 )
                 if locations:
-                    return PhotoStoreState(
+                    state = PhotoStoreState(
                         locations=locations,
                         last_option=last_option,
                         updated_at=updated_at,
                     )
+                    _state_cache = (cache_key, state)
+                    return _cached_copy(state)
         except json.JSONDecodeError:
             logger.warning("photo_store_settings: invalid JSON in %s", CONFIG_FILE)
     created_at = _now_iso()
@@ -139,13 +188,25 @@ def _read_state_file(default_root: Path) -> PhotoStoreState:
 
 
 def _write_state_file(state: PhotoStoreState) -> None:
+    global _state_cache
+    _state_cache = None
     _ensure_config_dir()
     payload = {
-        "locations": [asdict(loc) for loc in state.locations],
+        "locations": [loc.to_dict() for loc in state.locations],
         "last_option": state.last_option,
         "updated_at": state.updated_at or _now_iso(),
     }
-    CONFIG_FILE.write_text(json.dumps(payload, indent=2))
+    # Write to a unique sibling and rename so a crash never leaves a torn file.
+    tmp = CONFIG_FILE.with_name(f".{CONFIG_FILE.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with tmp.open("wb") as handle:
+            handle.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, CONFIG_FILE)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
 
 def load_photo_store_state(default_root: Path) -> PhotoStoreState:
@@ -178,6 +239,20 @@ def ensure_photo_store_dirs(base: Path) -> None:
         (base / name).mkdir(parents=True, exist_ok=True)
 
 
+def _clone_or_copy(src: str, dst: str) -> str:
+    if fcntl is not None and sys.platform.startswith("linux"):
+        try:
+            with open(src, "rb") as src_fh, open(dst, "wb") as dst_fh:
+                fcntl.ioctl(dst_fh.fileno(), _FICLONE, src_fh.fileno())
+        except OSError:
+            # Different filesystems or no reflink support; copy the bytes.
+            pass
+        else:
+            shutil.copystat(src, dst)
+            return dst
+    return shutil.copy2(src, dst)
+
+
 def _copy_directory(source: Path, destination: Path) -> None:
     if not source.exists():
         ensure_photo_store_dirs(destination)
@@ -186,7 +261,9 @@ def _copy_directory(source: Path, destination: Path) -> None:
         src_dir = source / name
         dest_dir = destination / name
         if src_dir.exists():
-            shutil.copytree(src_dir, dest_dir, dirs_exist_ok=True)
+            shutil.copytree(
+                src_dir, dest_dir, dirs_exist_ok=True, copy_function=_clone_or_copy
+            )
         else:
             dest_dir.mkdir(parents=True, exist_ok=True)
 
@@ -205,18 +282,17 @@ def _protected_prefixes() -> Sequence[Path]:
     return prefixes
 
 
+# Built once: prefix part tuples and their lengths, so a check is a few tuple
+# slices and set lookups.
+_PROTECTED_PARTS = frozenset(prefix.parts for prefix in _protected_prefixes())
+_PROTECTED_DEPTHS = frozenset(len(parts) for parts in _PROTECTED_PARTS)
+
+
 def _is_protected(path: Path) -> bool:
-    if path == Path("/"):
+    parts = path.parts
+    if parts == ("/",):
         return True
-    for prefix in _protected_prefixes():
-        try:
-            if path == prefix:
-                return True
-            path.relative_to(prefix)
-            return True
-        except ValueError:
-            continue
-    return False
+    return any(parts[:depth] in _PROTECTED_PARTS for depth in _PROTECTED_DEPTHS)
 
 
 def validate_candidate_path(candidate: str) -> tuple[bool, str | None]:
@@ -239,7 +315,7 @@ def update_state(
     state: PhotoStoreState, new_path: Path, mode: PhotoStoreMode
 ) -> PhotoStoreState:
     normalized = new_path
-    next_state = copy.deepcopy(state)
+    next_state = replace(state, locations=list(state.locations))
     if mode == "move":
         logger.info("photo_store_settings: copying data to %s", normalized)
         current_primary = Path(state.locations[0].path)
@@ -314,25 +390,32 @@ def apply_state_to_settings(settings, state: PhotoStoreState) -> None:
     setattr(
         settings,
         "photo_store_locations",
-        [asdict(loc) for loc in state.locations],
+        [loc.to_dict() for loc in state.locations],
     )
-    setattr(settings, "photo_store_state", asdict(state))
+    setattr(settings, "photo_store_state", state.to_dict())
+    # Same paths return the memoized storage, whose resolved root may predate
+    # the switch (e.g. the root is a symlink that now points elsewhere).
+    PosixStorage.from_env().invalidate()
 
 
-def make_location_payload(
+async def make_location_payload(
     state: PhotoStoreState,
 ) -> list[dict[str, str | None]]:
-    entries: list[dict[str, str | None]] = []
-    for loc in state.locations:
-        path = Path(loc.path)
-        status, message = describe_location(path)
-        entries.append(
-            {
-                "id": loc.id,
-                "path": loc.path,
-                "role": loc.role,
-                "status": status,
-                "message": message,
-            }
+    # Probe every location concurrently; an offline network mount can block
+    # for seconds and should not hold up the healthy ones.
+    statuses = await asyncio.gather(
+        *(
+            asyncio.to_thread(describe_location, Path(loc.path))
+            for loc in state.locations
         )
-    return entries
+    )
+    return [
+        {
+            "id": loc.id,
+            "path": loc.path,
+            "role": loc.role,
+            "status": status,
+            "message": message,
+        }
+        for loc, (status, message) in zip(state.locations, statuses)
+    ]
@@ -8,10 +8,11 @@ standard images.
 
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from PIL import Image
 
@@ -66,28 +67,30 @@ class RawReaderService:
     metadata.
     """
 
-    RAW_EXTENSIONS: Set[str] = {
-        "3fr",
-        "arw",
-        "cr2",
-        "cr3",
-        "crw",
-        "dng",
-        "erf",
-        "iiq",
-        "kdc",
-        "mrw",
-        "nef",
-        "nrw",
-        "orf",
-        "pef",
-        "raf",
-        "raw",
-        "rw2",
-        "rwl",
-        "sr2",
-        "srw",
-    }
+    RAW_EXTENSIONS: FrozenSet[str] = frozenset(
+        {
+            ".3fr",
+            ".arw",
+            ".cr2",
+            ".cr3",
+            ".crw",
+            ".dng",
+            ".erf",
+            ".iiq",
+            ".kdc",
+            ".mrw",
+            ".nef",
+            ".nrw",
+            ".orf",
+            ".pef",
+            ".raf",
+            ".raw",
+            ".rw2",
+            ".rwl",
+            ".sr2",
+            ".srw",
+        }
+    )
 
     def __init__(self, adapter: Optional[RawPyAdapter] = None) -> None:
         """
@@ -116,8 +119,7 @@ class RawReaderService:
             ``True`` when the service should attempt rawpy decoding.
         """
 
-        suffix = path.suffix.lower().lstrip(".")
-        return suffix in self.RAW_EXTENSIONS
+        return os.path.splitext(path)[1].lower() in self.RAW_EXTENSIONS
 
     def read(self, path: Path) -> RawReadResult:
         """
@@ -207,16 +209,19 @@ class RawReaderService:
             Metadata with ``None`` values pruned.
         """
 
-        candidates: Dict[str, Any] = {
-            "width": raw_result.width,
-            "height": raw_result.height,
-            "raw_width": raw_result.raw_width,
-            "raw_height": raw_result.raw_height,
-            "flip": raw_result.flip,
-            "color_description": raw_result.color_description,
-            "raw_type": raw_result.raw_type,
-        }
-        return {key: value for key, value in candidates.items() if value is not None}
+        metadata: Dict[str, Any] = {}
+        for key, value in (
+            ("width", raw_result.width),
+            ("height", raw_result.height),
+            ("raw_width", raw_result.raw_width),
+            ("raw_height", raw_result.raw_height),
+            ("flip", raw_result.flip),
+            ("color_description", raw_result.color_description),
+            ("raw_type", raw_result.raw_type),
+        ):
+            if value is not None:
+                metadata[key] = value
+        return metadata
 
     def _normalise_thumbnail(
         self, thumbnail: RawPyThumbnail
@@ -15,7 +15,24 @@ ASSET_STATUS_VALUES = [
 
 
 async def ensure_enum_values(db: AsyncSession) -> None:
+    if db.get_bind().dialect.name != "postgresql":
+        # Other backends store the enum as plain text; there is no type to extend.
+        return
+    existing = set(
+        (
+            await db.execute(
+                text(
+                    "SELECT e.enumlabel FROM pg_enum e "
+                    "JOIN pg_type t ON t.oid = e.enumtypid "
+                    "WHERE t.typname = 'assetstatus'"
+                )
+            )
+        ).scalars()
+    )
+    # Usually every value is present and no DDL runs at all.
     for value in ASSET_STATUS_VALUES:
+        if value in existing:
+            continue
         await db.execute(
             text(f"ALTER TYPE assetstatus ADD VALUE IF NOT EXISTS '{value}'")
         )
@@ -1,13 +1,24 @@
 from dataclasses import dataclass, field
+from functools import cached_property, lru_cache
 from pathlib import Path, PurePosixPath
+from typing import Sequence
 from uuid import UUID
+import asyncio
+import errno
 import logging
+import os
+import posixpath
 import shutil
+import time
 
 from .deps import get_settings
 
 logger = logging.getLogger("arciva.storage")
 
+# find_derivative answers are reused for this long, per content hash.
+_DERIVATIVE_TTL_SECONDS = 1.0
+_DERIVATIVE_CACHE_LIMIT = 4096
+
 
 @dataclass
 class PosixStorage:
@@ -17,40 +28,63 @@ class PosixStorage:
     derivatives: Path
     exports: Path
     _extra_derivative_roots: list[Path] = field(default_factory=list)
+    _derivative_cache: dict[str, dict[str, tuple[float, Path | None]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
 
     @classmethod
     def from_env(cls) -> "PosixStorage":
+        """Return the storage for the current settings.
+
+        Instances are memoized on the configured paths, so repeated calls are
+        cheap and a PhotoStore switch (which rewrites the settings) yields a
+        fresh instance.
+        """
         s = get_settings()
-        root = Path(s.fs_root)
-        uploads = Path(s.fs_uploads_dir)
-        originals = Path(s.fs_originals_dir)
-        derivatives = Path(s.fs_derivatives_dir)
-        exports = Path(s.fs_exports_dir)
-        extra_roots: list[Path] = []
+        extra_roots: list[str] = []
         locations = getattr(s, "photo_store_locations", None)
         if isinstance(locations, list) and len(locations) > 1:
             for entry in locations[1:]:
                 path_value = entry.get("path") if isinstance(entry, dict) else None
                 if not isinstance(path_value, str):
                     continue
-                extra_roots.append(Path(path_value) / "derivatives")
-        return cls(
-            root,
-            uploads,
-            originals,
-            derivatives,
-            exports,
-            _extra_derivative_roots=extra_roots,
+                extra_roots.append(path_value)
+        return _storage_for(
+            cls,
+            s.fs_root,
+            s.fs_uploads_dir,
+            s.fs_originals_dir,
+            s.fs_derivatives_dir,
+            s.fs_exports_dir,
+            tuple(extra_roots),
         )
 
+    @cached_property
+    def _root_resolved(self) -> Path:
+        return self.root.resolve()
+
+    @cached_property
+    def _root_prefix(self) -> str:
+        return os.path.join(os.fspath(self._root_resolved), "")
+
+    def invalidate(self) -> None:
+        """Forget the resolved media root, e.g. after the root symlink moved."""
+        self.__dict__.pop("_root_resolved", None)
+        self.__dict__.pop("_root_prefix", None)
+
     def storage_key_for(self, path: Path) -> str:
         """
         Return a POSIX-style relative key for a path under the media root.
         """
-        root_resolved = self.root.resolve()
+        # Paths built by this class are already normalized and under the
+        # resolved root, so a string prefix check avoids the resolve() walk.
+        raw = os.fspath(path)
+        prefix = self._root_prefix
+        if raw.startswith(prefix) and os.path.normpath(raw) == raw:
+            return raw[len(prefix) :].replace(os.sep, "/")
         try:
             relative = (
-                path.expanduser().resolve(strict=False).relative_to(root_resolved)
+                path.expanduser().resolve(strict=False).relative_to(self._root_resolved)
             )
         except ValueError as exc:
             raise ValueError(
@@ -66,29 +100,25 @@ class PosixStorage:
             return None
         if raw.startswith("file://"):
             raw = raw[7:]
-        candidate = Path(raw)
         # Support legacy absolute paths for backwards compatibility.
-        if candidate.is_absolute():
+        if raw.startswith("/"):
+            candidate = Path(raw)
             try:
-                candidate.relative_to(self.root.resolve())
+                candidate.relative_to(self._root_resolved)
             except ValueError:
                 logger.warning(
                     "path_from_key: legacy path outside media root %s",
                     candidate,
                 )
             return candidate
-        posix_path = PurePosixPath(raw)
-        if any(part == ".." for part in posix_path.parts):
+        normalized = _normalize_relative_key(raw)
+        if normalized is None:
             raise ValueError(f"Invalid storage key: {storage_key!r}")
-        parts = [part for part in posix_path.parts if part not in {"", ".", "/"}]
-        if not parts:
-            raise ValueError(f"Invalid storage key: {storage_key!r}")
-        resolved = self.root
-        for part in parts:
-            resolved = resolved / part
-        resolved = resolved.resolve(strict=False)
+        # Resolve the joined path itself: a symlink under the root can still
+        # point outside of it.
+        resolved = (self._root_resolved / normalized).resolve(strict=False)
         try:
-            resolved.relative_to(self.root.resolve())
+            resolved.relative_to(self._root_resolved)
         except ValueError as exc:
             raise ValueError(
                 f"Resolved storage key escapes media root: {storage_key!r}"
@@ -105,30 +135,81 @@ class PosixStorage:
     def original_path_for(self, sha256_hex: str, ext: str) -> Path:
         if not ext.startswith("."):
             ext = f".{ext}"
-        dest = self.originals / f"{sha256_hex}{ext}"
-        dest.parent.mkdir(parents=True, exist_ok=True)
-        return dest
+        # Originals are flat, so ensure self.originals itself rather than
+        # building dest.parent. The mkdir is not cached: other processes (API,
+        # worker) may delete directories under the media root at any time.
+        self.originals.mkdir(parents=True, exist_ok=True)
+        return self.originals / f"{sha256_hex}{ext}"
 
     def move_to_originals(self, temp_path: Path, sha256_hex: str, ext: str) -> Path:
         dest = self.original_path_for(sha256_hex, ext)
-        # If already exists (dedupe), remove temp and return existing
-        if dest.exists():
-            temp_path.unlink(missing_ok=True)
-            return dest
-        shutil.move(str(temp_path), str(dest))
+        # Originals are content-addressed, so replacing an existing duplicate
+        # is harmless and saves the exists() probe on the common path.
+        try:
+            os.replace(temp_path, dest)
+        except OSError as exc:
+            if exc.errno != errno.EXDEV:
+                raise
+            shutil.move(str(temp_path), str(dest))
         return dest
 
     def derivative_path(self, sha256_hex: str, variant: str, fmt: str) -> Path:
-        p = self.derivatives / sha256_hex / f"{variant}.{fmt}"
+        name = f"{variant}.{fmt}"
+        p = self.derivatives / sha256_hex / name
         p.parent.mkdir(parents=True, exist_ok=True)
+        self._derivative_cache.get(sha256_hex, {}).pop(name, None)
         return p
 
     def find_derivative(self, sha256_hex: str, variant: str, fmt: str) -> Path | None:
+        name = f"{variant}.{fmt}"
+        now = time.monotonic()
+        entries = self._derivative_cache.get(sha256_hex)
+        cached = entries.get(name) if entries else None
+        if cached is not None and now - cached[0] < _DERIVATIVE_TTL_SECONDS:
+            return cached[1]
+        found: Path | None = None
         for root in [self.derivatives, *self._extra_derivative_roots]:
-            candidate = root / sha256_hex / f"{variant}.{fmt}"
-            if candidate.exists():
-                return candidate
-        return None
+            candidate = root / sha256_hex / name
+            if os.path.exists(candidate):
+                found = candidate
+                break
+        if entries is None:
+            if len(self._derivative_cache) >= _DERIVATIVE_CACHE_LIMIT:
+                self._derivative_cache.clear()
+            entries = self._derivative_cache.setdefault(sha256_hex, {})
+        entries[name] = (now, found)
+        return found
+
+    def find_derivatives_bulk(
+        self, sha256_hex: str, variants: Sequence[tuple[str, str]]
+    ) -> dict[tuple[str, str], Path]:
+        """Look up several ``(variant, fmt)`` derivatives of one hash at once.
+
+        Each derivative root's hash directory is listed once instead of
+        stat-ing every candidate; the answers also seed ``find_derivative``.
+        """
+        wanted = {f"{variant}.{fmt}": (variant, fmt) for variant, fmt in variants}
+        found: dict[tuple[str, str], Path] = {}
+        for root in [self.derivatives, *self._extra_derivative_roots]:
+            if len(found) == len(wanted):
+                break
+            directory = root / sha256_hex
+            try:
+                with os.scandir(directory) as entries:
+                    present = {entry.name for entry in entries}
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            for name, key in wanted.items():
+                if key not in found and name in present:
+                    found[key] = directory / name
+        now = time.monotonic()
+        cache = self._derivative_cache
+        if sha256_hex not in cache and len(cache) >= _DERIVATIVE_CACHE_LIMIT:
+            cache.clear()
+        entries = cache.setdefault(sha256_hex, {})
+        for name, key in wanted.items():
+            entries[name] = (now, found.get(key))
+        return found
 
     def remove_original(self, storage_key: str | None) -> None:
         if not storage_key:
@@ -152,8 +233,65 @@ class PosixStorage:
             except IsADirectoryError:
                 shutil.rmtree(path, ignore_errors=True)
 
+    def _forget_derivatives(self, sha256_hex: str) -> list[Path]:
+        self._derivative_cache.pop(sha256_hex, None)
+        return [
+            root / sha256_hex
+            for root in [self.derivatives, *self._extra_derivative_roots]
+        ]
+
     def remove_derivatives(self, sha256_hex: str | None) -> None:
         if not sha256_hex:
             return
-        for root in [self.derivatives, *self._extra_derivative_roots]:
-            shutil.rmtree(root / sha256_hex, ignore_errors=True)
+        for target in self._forget_derivatives(sha256_hex):
+            shutil.rmtree(target, ignore_errors=True)
+
+    async def remove_derivatives_async(self, sha256_hex: str | None) -> None:
+        """Like ``remove_derivatives``, deleting from every root concurrently.
+
+        PhotoStore locations usually sit on separate disks, so the removals
+        run in worker threads instead of one after another on the event loop.
+        """
+        if not sha256_hex:
+            return
+        await asyncio.gather(
+            *(
+                asyncio.to_thread(shutil.rmtree, target, ignore_errors=True)
+                for target in self._forget_derivatives(sha256_hex)
+            )
+        )
+
+
+@lru_cache(maxsize=1024)
+def _normalize_relative_key(raw: str) -> str | None:
+    """Normalize a relative storage key; ``None`` if it is invalid.
+
+    Only the string parsing is cached (invalid keys too, so a bad row does not
+    re-parse per request); containment is checked on the resolved path.
+    """
+    if "/../" in f"/{raw}/":
+        return None
+    normalized = posixpath.normpath(raw)
+    if normalized == ".":
+        return None
+    return normalized
+
+
+@lru_cache(maxsize=1)
+def _storage_for(
+    cls: type[PosixStorage],
+    root: str,
+    uploads: str,
+    originals: str,
+    derivatives: str,
+    exports: str,
+    extra_roots: tuple[str, ...],
+) -> PosixStorage:
+    return cls(
+        Path(root),
+        Path(uploads),
+        Path(originals),
+        Path(derivatives),
+        Path(exports),
+        _extra_derivative_roots=[Path(path) / "derivatives" for path in extra_roots],
+    )
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from pathlib import Path
+from functools import lru_cache
 from typing import Optional
 
 from ..constants import JPEG_EXTENSIONS, RAW_EXTENSIONS
@@ -14,6 +14,14 @@ _EXTENSION_OVERRIDES = {
     ".gif": "GIF",
 }
 
+# One lookup for extension-based formats; later entries win, keeping the old
+# RAW, then JPEG, then override precedence.
+_EXT_TO_FORMAT = {
+    **_EXTENSION_OVERRIDES,
+    **dict.fromkeys(JPEG_EXTENSIONS, "JPEG"),
+    **dict.fromkeys(RAW_EXTENSIONS, "RAW"),
+}
+
 _MIME_OVERRIDES = {
     "image/jpeg": "JPEG",
     "image/png": "PNG",
@@ -29,17 +37,19 @@ def detect_asset_format(filename: Optional[str], mime: Optional[str] = None) ->
     + MIME hints.
     """
 
-    ext = Path(filename or "").suffix.lower()
-    if ext in RAW_EXTENSIONS:
-        return "RAW"
-    if ext in JPEG_EXTENSIONS:
-        return "JPEG"
-    if ext in _EXTENSION_OVERRIDES:
-        return _EXTENSION_OVERRIDES[ext]
-    if mime:
-        mime_key = mime.lower()
-        if mime_key in _MIME_OVERRIDES:
-            return _MIME_OVERRIDES[mime_key]
+    # Same rules as Path.suffix: no suffix for dotfiles or a bare trailing dot.
+    stem, _, tail = (filename or "").rpartition("/")[2].rpartition(".")
+    ext = f".{tail.lower()}" if stem and tail else ""
+    return _detect_format(ext, mime.lower() if mime else None)
+
+
+@lru_cache(maxsize=4096)
+def _detect_format(ext: str, mime_key: Optional[str]) -> str:
+    fmt = _EXT_TO_FORMAT.get(ext)
+    if fmt is not None:
+        return fmt
+    if mime_key in _MIME_OVERRIDES:
+        return _MIME_OVERRIDES[mime_key]
     if ext:
         return ext.lstrip(".").upper()
     return "UNKNOWN"
@@ -15,6 +15,13 @@ async def ensure_project_access(
     project_id: UUID,
     user_id: UUID,
 ) -> models.Project:
+    # Sessions are request-scoped, so a project checked once stays valid for
+    # the rest of the request unless it was deleted from this session.
+    cache = db.info.setdefault("_project_access_cache", {})
+    key = (project_id, user_id)
+    cached = cache.get(key)
+    if cached is not None and cached in db:
+        return cached
     project = (
         await db.execute(
             select(models.Project).where(
@@ -25,4 +32,5 @@ async def ensure_project_access(
     ).scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    cache[key] = project
     return project
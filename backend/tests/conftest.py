@@ -1,13 +1,15 @@
-import asyncio
 import os
 from pathlib import Path
 import tempfile
 import sys
+import uuid
 from pathlib import Path as _P
+from types import SimpleNamespace
 
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     async_sessionmaker,
@@ -24,14 +26,19 @@ _DEFAULT_MEDIA_ROOT = Path(tempfile.gettempdir()) / "film_cabinet_test_media"
 os.environ.setdefault("APP_DB_PATH", str(_DEFAULT_DB_PATH))
 os.environ.setdefault("APP_MEDIA_ROOT", str(_DEFAULT_MEDIA_ROOT))
 
+# Owner of all test data; mock_user inserts this row once per session.
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
 """Pytest fixtures for backend tests with isolated settings and DB."""
 
 
-@pytest.fixture(scope="session")
-def event_loop():
-    loop = asyncio.new_event_loop()
-    yield loop
-    loop.close()
+def pytest_collection_modifyitems(items):
+    # Run every async test on the session loop that owns the shared engine,
+    # connection pool and client, instead of a fresh loop per test.
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
 
 
 @pytest.fixture(scope="session")
@@ -52,37 +59,48 @@ def test_settings(temp_fs_root):
         db_path.unlink()
     db_url = f"sqlite+aiosqlite:///{db_path}"
 
-    class _S:
-        # minimal attributes used by the app
-        app_env = "test"
-        secret_key = "test"
-        allowed_origins = ["*"]
-        app_db_path = str(db_path)
-        app_media_root = str(temp_fs_root)
-        database_url = db_url
-        redis_url = "redis://127.0.0.1:6379/0"
-        fs_root = str(temp_fs_root)
-        fs_uploads_dir = str(temp_fs_root / "uploads")
-        fs_originals_dir = str(temp_fs_root / "originals")
-        fs_derivatives_dir = str(temp_fs_root / "derivatives")
-        fs_exports_dir = str(temp_fs_root / "exports")
-        thumb_sizes = [256]
-        max_upload_mb = 5
-        worker_concurrency = 1
-        logs_dir = str(temp_fs_root / "logs")
-        export_retention_hours = 24
+    # Minimal attributes used by the app. A SimpleNamespace rather than a
+    # slotted class: PhotoStore code sets extra attributes on the settings.
+    settings = SimpleNamespace(
+        app_env="test",
+        secret_key="test",
+        allowed_origins=["*"],
+        app_db_path=str(db_path),
+        app_media_root=str(temp_fs_root),
+        database_url=db_url,
+        redis_url="redis://127.0.0.1:6379/0",
+        fs_root=str(temp_fs_root),
+        fs_uploads_dir=str(temp_fs_root / "uploads"),
+        fs_originals_dir=str(temp_fs_root / "originals"),
+        fs_derivatives_dir=str(temp_fs_root / "derivatives"),
+        fs_exports_dir=str(temp_fs_root / "exports"),
+        thumb_sizes=[256],
+        max_upload_mb=5,
+        worker_concurrency=1,
+        logs_dir=str(temp_fs_root / "logs"),
+        export_retention_hours=24,
+    )
 
     # Ensure env var points to test DB before importing app modules
-    os.environ["APP_DB_PATH"] = _S.app_db_path
-    os.environ["APP_MEDIA_ROOT"] = _S.app_media_root
-    return _S()
+    os.environ["APP_DB_PATH"] = settings.app_db_path
+    os.environ["APP_MEDIA_ROOT"] = settings.app_media_root
+    return settings
 
 
-@pytest_asyncio.fixture(scope="session")
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
 async def test_engine(test_settings):
     engine = create_async_engine(
         test_settings.database_url, echo=False, pool_pre_ping=True
     )
+
+    # The test database is throwaway: skip the rollback journal and fsyncs.
+    @event.listens_for(engine.sync_engine, "connect")
+    def _fast_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=MEMORY")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
     # create schema (ensure models are imported so metadata is populated)
     from backend.app.db import Base
     import backend.app.models  # noqa: F401
@@ -100,22 +118,86 @@ def TestSessionLocal(test_engine):
     return async_sessionmaker(test_engine, expire_on_commit=False, class_=AsyncSession)
 
 
-@pytest_asyncio.fixture(scope="session", autouse=True)
+@pytest_asyncio.fixture(autouse=True, loop_scope="session")
+async def _rollback_test_writes(test_engine, TestSessionLocal, mock_user):
+    # Every session of a test shares one connection whose transaction is
+    # rolled back afterwards. "rollback_only" keeps session commits and
+    # closes from touching it, so a request session closing after a
+    # background task cannot undo that task's writes.
+    async with test_engine.connect() as connection:
+        await connection.begin()
+        TestSessionLocal.configure(
+            bind=connection, join_transaction_mode="rollback_only"
+        )
+        try:
+            yield
+        finally:
+            TestSessionLocal.configure(
+                bind=test_engine, join_transaction_mode="conservative_savepoint"
+            )
+            await connection.rollback()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session", autouse=True)
 async def mock_user(TestSessionLocal):
-    import uuid
     from backend.app import models
 
     async with TestSessionLocal() as session:
-        user_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
-        user = await session.get(models.User, user_id)
+        user = await session.get(models.User, USER_ID)
         if not user:
             user = models.User(
-                id=user_id, email="test@example.com", password_hash="mock"
+                id=USER_ID, email="test@example.com", password_hash="mock"
             )
             session.add(user)
             await session.commit()
 
 
+@pytest.fixture
+def make_linked_asset():
+    """Factory adding a READY asset linked to a project, with its metadata state.
+
+    Rows are flushed level by level (asset, link, state) since the models have
+    no relationship()s to order the INSERTs; the caller commits.
+    """
+    from backend.app import models
+
+    async def _make(
+        session,
+        project_id,
+        *,
+        is_preview: bool = False,
+        preview_order=None,
+        picked: bool = False,
+        rating: int = 0,
+        **asset_fields,
+    ):
+        fields = {
+            "mime": "image/jpeg",
+            "size_bytes": 100,
+            "status": models.AssetStatus.READY,
+            "reference_count": 1,
+            **asset_fields,
+        }
+        asset = models.Asset(id=uuid.uuid4(), user_id=USER_ID, **fields)
+        link = models.ProjectAsset(
+            id=uuid.uuid4(),
+            user_id=USER_ID,
+            project_id=uuid.UUID(str(project_id)),
+            asset_id=asset.id,
+            is_preview=is_preview,
+            preview_order=preview_order,
+        )
+        session.add(asset)
+        await session.flush()
+        session.add(link)
+        await session.flush()
+        session.add(models.MetadataState(link_id=link.id, picked=picked, rating=rating))
+        await session.flush()
+        return asset, link
+
+    return _make
+
+
 @pytest.fixture(scope="session")
 def app(test_settings, TestSessionLocal, test_engine):
     # Monkeypatch get_settings and get_db before creating the app
@@ -152,12 +234,11 @@ def app(test_settings, TestSessionLocal, test_engine):
     # override get_current_user
     from backend.app import security
     from backend.app import models
-    import uuid
 
     async def _get_current_user_override():
         # Return the same user created by mock_user fixture
         return models.User(
-            id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            id=USER_ID,
             email="test@example.com",
             password_hash="mock",
         )
@@ -171,8 +252,11 @@ def app(test_settings, TestSessionLocal, test_engine):
     return application
 
 
-@pytest_asyncio.fixture
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
 async def client(app):
+    # One client for the whole run: requests carry no per-test state (auth is
+    # overridden and no cookies are set), and database writes are rolled back
+    # per test by _rollback_test_writes.
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://testserver") as ac:
         yield ac
@@ -1,4 +1,5 @@
 import uuid
+from datetime import datetime, timezone
 from pathlib import Path
 
 import pytest
@@ -6,39 +7,59 @@ from sqlalchemy import select
 
 from backend.app import models
 from backend.app.storage import PosixStorage
+from backend.app.utils.assets import detect_asset_format
 
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
 
-async def _seed_asset(
-    session, project_id: uuid.UUID, filename: str, mime: str
-) -> uuid.UUID:
-    storage = PosixStorage.from_env()
-    sha = uuid.uuid4().hex
-    ext = Path(filename).suffix or ".bin"
-    original_path = storage.original_path_for(sha, ext)
-    original_path.write_bytes(b"data")
 
-    asset = models.Asset(
-        user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
-        original_filename=filename,
-        mime=mime,
-        size_bytes=123,
-        status=models.AssetStatus.READY,
-        storage_uri=storage.storage_key_for(original_path),
-        sha256=sha,
-        reference_count=1,
-    )
-    session.add(asset)
+async def _seed_assets(
+    session, project_id: uuid.UUID, files: list[tuple[str, str]]
+) -> list[uuid.UUID]:
+    """Insert READY assets linked to ``project_id`` and commit once.
+
+    Rows are added level by level (assets, links, metadata states) with one
+    flush per level: without relationship()s the unit of work does not order
+    INSERTs by foreign key, so a single flush could insert children first.
+    """
+    storage = PosixStorage.from_env()
+    assets = []
+    for filename, mime in files:
+        sha = uuid.uuid4().hex
+        ext = Path(filename).suffix or ".bin"
+        original_path = storage.original_path_for(sha, ext)
+        original_path.write_bytes(b"data")
+        assets.append(
+            models.Asset(
+                id=uuid.uuid4(),
+                user_id=USER_ID,
+                original_filename=filename,
+                mime=mime,
+                size_bytes=123,
+                status=models.AssetStatus.READY,
+                storage_uri=storage.storage_key_for(original_path),
+                sha256=sha,
+                reference_count=1,
+            )
+        )
+    links = [
+        models.ProjectAsset(
+            id=uuid.uuid4(), user_id=USER_ID, project_id=project_id, asset_id=asset.id
+        )
+        for asset in assets
+    ]
+    session.add_all(assets)
     await session.flush()
-    link = models.ProjectAsset(
-        user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
-        project_id=project_id,
-        asset_id=asset.id,
-    )
-    session.add(link)
+    session.add_all(links)
     await session.flush()
-    session.add(models.MetadataState(link_id=link.id))
+    session.add_all(models.MetadataState(link_id=link.id) for link in links)
     await session.commit()
-    return asset.id
+    return [asset.id for asset in assets]
+
+
+async def _seed_asset(
+    session, project_id: uuid.UUID, filename: str, mime: str
+) -> uuid.UUID:
+    return (await _seed_assets(session, project_id, [(filename, mime)]))[0]
 
 
 @pytest.mark.asyncio
@@ -49,8 +70,11 @@ async def test_pair_detection_and_listing(client, TestSessionLocal):
     proj_id = uuid.UUID(r.json()["id"])
 
     async with TestSessionLocal() as session:
-        jpeg_id = await _seed_asset(session, proj_id, "DSCF0001.JPG", "image/jpeg")
-        raw_id = await _seed_asset(session, proj_id, "DSCF0001.RAF", "image/x-raf")
+        jpeg_id, raw_id = await _seed_assets(
+            session,
+            proj_id,
+            [("DSCF0001.JPG", "image/jpeg"), ("DSCF0001.RAF", "image/x-raf")],
+        )
 
     r = await client.get(f"/v1/projects/{proj_id}/assets")
     assert r.status_code == 200
@@ -68,6 +92,31 @@ async def test_pair_detection_and_listing(client, TestSessionLocal):
     assert raw_item["stack_primary_asset_id"] == str(raw_id)
 
 
+@pytest.mark.asyncio
+async def test_pairing_assigns_several_new_pairs(client, TestSessionLocal):
+    r = await client.post("/v1/projects", json={"title": "Many pairs"})
+    assert r.status_code == 201
+    proj_id = uuid.UUID(r.json()["id"])
+
+    async with TestSessionLocal() as session:
+        await _seed_assets(
+            session,
+            proj_id,
+            [
+                (f"IMG_{index}{ext}", mime)
+                for index in range(3)
+                for ext, mime in ((".JPG", "image/jpeg"), (".RAF", "image/x-raf"))
+            ],
+        )
+
+    r = await client.get(f"/v1/projects/{proj_id}/assets")
+    assert r.status_code == 200
+    pair_ids = [item["pair_id"] for item in r.json()]
+    assert len(pair_ids) == 6
+    assert None not in pair_ids
+    assert len(set(pair_ids)) == 3
+
+
 @pytest.mark.asyncio
 async def test_interactions_mirror_pair(client, TestSessionLocal):
     payload = {"title": "Interactions", "client": "ACME", "note": "sync"}
@@ -76,8 +125,11 @@ async def test_interactions_mirror_pair(client, TestSessionLocal):
     proj_id = uuid.UUID(r.json()["id"])
 
     async with TestSessionLocal() as session:
-        jpeg_id = await _seed_asset(session, proj_id, "FILE0002.JPG", "image/jpeg")
-        raw_id = await _seed_asset(session, proj_id, "FILE0002.RAF", "image/x-raf")
+        jpeg_id, raw_id = await _seed_assets(
+            session,
+            proj_id,
+            [("FILE0002.JPG", "image/jpeg"), ("FILE0002.RAF", "image/x-raf")],
+        )
 
     body = {
         "asset_ids": [str(jpeg_id)],
@@ -121,3 +173,328 @@ async def test_interactions_mirror_pair(client, TestSessionLocal):
             assert row.color_label == models.ColorLabel.RED
             assert row.picked is True
             assert row.rejected is False
+
+
+@pytest.mark.asyncio
+async def test_listing_uses_recorded_derivatives_for_urls(client, TestSessionLocal):
+    payload = {"title": "Derivatives", "client": "ACME", "note": "urls"}
+    r = await client.post("/v1/projects", json=payload)
+    assert r.status_code == 201
+    proj_id = uuid.UUID(r.json()["id"])
+
+    async with TestSessionLocal() as session:
+        with_thumb, without_thumb = await _seed_assets(
+            session,
+            proj_id,
+            [("THUMB0001.JPG", "image/jpeg"), ("NOTHUMB0001.JPG", "image/jpeg")],
+        )
+        session.add(
+            models.Derivative(
+                asset_id=with_thumb,
+                variant="thumb_256",
+                format="jpg",
+                width=256,
+                height=171,
+                storage_key="derivatives/thumb.jpg",
+            )
+        )
+        await session.commit()
+
+    r = await client.get(f"/v1/projects/{proj_id}/assets")
+    assert r.status_code == 200
+    by_id = {item["id"]: item for item in r.json()}
+    assert by_id[str(with_thumb)]["thumb_url"] == f"/v1/assets/{with_thumb}/thumbs/256"
+    assert by_id[str(with_thumb)]["preview_url"] is None
+    assert by_id[str(without_thumb)]["thumb_url"] is None
+
+
+@pytest.mark.asyncio
+async def test_collect_derivatives_bulk_groups_by_asset(client, TestSessionLocal):
+    from backend.app.services import assets as assets_service
+
+    r = await client.post("/v1/projects", json={"title": "Derivatives"})
+    assert r.status_code == 201
+    proj_id = uuid.UUID(r.json()["id"])
+
+    async with TestSessionLocal() as session:
+        first = await _seed_asset(session, proj_id, "D1.JPG", "image/jpeg")
+        second = await _seed_asset(session, proj_id, "D2.JPG", "image/jpeg")
+        session.add_all(
+            models.Derivative(
+                asset_id=first,
+                variant=variant,
+                format="jpg",
+                width=size,
+                height=size,
+                storage_key=f"derivatives/{variant}.jpg",
+            )
+            for variant, size in (("thumb_256", 256), ("preview_1024", 1024))
+        )
+        await session.commit()
+
+        grouped = await assets_service.collect_derivatives_bulk(
+            session, [first, second]
+        )
+        assert set(grouped) == {first}
+        assert {d.variant for d in grouped[first]} == {"thumb_256", "preview_1024"}
+        assert grouped[first][0].url.startswith(f"/v1/assets/{first}/derivatives/")
+
+        asset = await session.get(models.Asset, second)
+        assert await assets_service.collect_derivatives(asset, session) == []
+
+
+@pytest.mark.asyncio
+async def test_adopt_duplicate_links_existing_asset_into_projects(
+    client, TestSessionLocal
+):
+    from backend.app.services.dedup import adopt_duplicate_asset
+
+    project_ids = []
+    for title in ("Dedup A", "Dedup B"):
+        r = await client.post("/v1/projects", json={"title": title})
+        assert r.status_code == 201
+        project_ids.append(uuid.UUID(r.json()["id"]))
+    first, second = project_ids
+
+    async with TestSessionLocal() as session:
+        existing_id, duplicate_id = await _seed_assets(
+            session, first, [("KEEP.JPG", "image/jpeg"), ("COPY.JPG", "image/jpeg")]
+        )
+        link = models.ProjectAsset(
+            user_id=USER_ID,
+            project_id=second,
+            asset_id=duplicate_id,
+        )
+        session.add(link)
+        await session.flush()
+        session.add(models.MetadataState(link_id=link.id, rating=4))
+        await session.commit()
+
+    async with TestSessionLocal() as session:
+        existing = await session.get(models.Asset, existing_id)
+        duplicate = await session.get(models.Asset, duplicate_id)
+        await adopt_duplicate_asset(
+            session,
+            duplicate_asset=duplicate,
+            existing_asset=existing,
+            storage=PosixStorage.from_env(),
+        )
+
+    async with TestSessionLocal() as session:
+        assert await session.get(models.Asset, duplicate_id) is None
+        existing = await session.get(models.Asset, existing_id)
+        assert existing.reference_count == 2
+        rows = (
+            await session.execute(
+                select(models.ProjectAsset.project_id, models.MetadataState.rating)
+                .join(
+                    models.MetadataState,
+                    models.MetadataState.link_id == models.ProjectAsset.id,
+                )
+                .where(models.ProjectAsset.asset_id == existing_id)
+            )
+        ).all()
+        assert dict(rows) == {first: 0, second: 4}
+
+
+@pytest.mark.asyncio
+async def test_ensure_state_for_link_inserts_once(client, TestSessionLocal):
+    from backend.app.services.metadata_states import ensure_state_for_link
+
+    r = await client.post("/v1/projects", json={"title": "States"})
+    assert r.status_code == 201
+    project_id = uuid.UUID(r.json()["id"])
+
+    async with TestSessionLocal() as session:
+        asset_id = await _seed_asset(session, project_id, "STATE.JPG", "image/jpeg")
+        link = (
+            await session.execute(
+                select(models.ProjectAsset).where(
+                    models.ProjectAsset.asset_id == asset_id
+                )
+            )
+        ).scalar_one()
+        existing = (
+            await session.execute(
+                select(models.MetadataState).where(
+                    models.MetadataState.link_id == link.id
+                )
+            )
+        ).scalar_one()
+        await session.delete(existing)
+        await session.flush()
+
+        template = models.MetadataState(rating=9, picked=True)
+        created = await ensure_state_for_link(session, link, template=template)
+        assert created.rating == 5
+        assert created.picked is True
+        assert created.created_at is not None
+        again = await ensure_state_for_link(session, link)
+        assert again.id == created.id
+        assert again.rating == 5
+        await session.commit()
+
+
+def test_metadata_cache_round_trip_is_atomic():
+    from backend.app.services import assets as assets_service
+
+    storage = PosixStorage.from_env()
+    asset = models.Asset(id=uuid.uuid4(), sha256=uuid.uuid4().hex)
+    payload = {"metadata": {"Make": "Fujifilm", 1: "x"}, "width": 10, "height": 5}
+
+    assets_service.write_metadata_cache(storage, asset, payload)
+
+    cache_path = assets_service.metadata_cache_path(storage, asset)
+    assert [p.name for p in cache_path.parent.iterdir()] == ["metadata.json"]
+    loaded = assets_service.load_metadata_cache(storage, asset)
+    assert loaded == {**payload, "metadata": {"Make": "Fujifilm", "1": "x"}}
+
+
+@pytest.mark.asyncio
+async def test_ensure_asset_metadata_populated_applies_caches(client, TestSessionLocal):
+    from backend.app.services import assets as assets_service
+
+    storage = PosixStorage.from_env()
+    async with TestSessionLocal() as session:
+        assets = []
+        for index in range(2):
+            asset = models.Asset(
+                user_id=USER_ID,
+                original_filename=f"cached{index}.jpg",
+                mime="image/jpeg",
+                size_bytes=1,
+                status=models.AssetStatus.READY,
+                sha256=uuid.uuid4().hex,
+            )
+            session.add(asset)
+            assets.append(asset)
+        await session.commit()
+        for index, asset in enumerate(assets):
+            assets_service.write_metadata_cache(
+                storage,
+                asset,
+                {
+                    "metadata": {"Model": f"X{index}"},
+                    "taken_at": "2024-03-14T12:00:00+00:00",
+                    "width": 30 + index,
+                    "height": 20,
+                    "warnings": ["EXIF_PIL_PARSE_FAILED"],
+                },
+            )
+
+        for asset in assets:
+            await assets_service.ensure_asset_metadata_populated(
+                asset, session, storage
+            )
+
+    async with TestSessionLocal() as session:
+        rows = (
+            (
+                await session.execute(
+                    select(models.Asset).where(
+                        models.Asset.id.in_([asset.id for asset in assets])
+                    )
+                )
+            )
+            .scalars()
+            .all()
+        )
+    by_id = {row.id: row for row in rows}
+    for index, asset in enumerate(assets):
+        row = by_id[asset.id]
+        assert row.metadata_json == {"Model": f"X{index}"}
+        assert row.width == 30 + index
+        assert row.metadata_warnings == "EXIF_PIL_PARSE_FAILED"
+
+
+def test_serialize_asset_item_matches_validated_model():
+    from backend.app import schemas
+    from backend.app.services import assets as assets_service
+
+    asset = models.Asset(
+        id=uuid.uuid4(),
+        original_filename="DSCF0003.JPG",
+        status=models.AssetStatus.READY,
+        metadata_warnings="EXIF_ERROR\nEXIFTOOL_NOT_INSTALLED",
+        size_bytes=12,
+    )
+    link = models.ProjectAsset(id=uuid.uuid4(), is_preview=False)
+    metadata = models.MetadataState(
+        id=uuid.uuid4(), rating=3, color_label=models.ColorLabel.RED, picked=True
+    )
+
+    item = assets_service.serialize_asset_item(
+        asset, link, None, PosixStorage.from_env(), metadata, set()
+    )
+
+    validated = schemas.AssetListItem.model_validate(item.model_dump())
+    assert item == validated
+    assert item.basename == "DSCF0003"
+    assert item.metadata_warnings == ["EXIF_ERROR", "EXIFTOOL_NOT_INSTALLED"]
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("DSCF0001.JPG", "DSCF0001"),
+        ("raw/DSCF0001.RAF", "DSCF0001"),
+        ("IMG.", "IMG."),
+        (".hidden", ".hidden"),
+        ("IMG..JPG", "IMG."),
+        ("dir/", "dir"),
+        ("  .jpg", None),
+        (None, None),
+    ],
+)
+def test_basename_from_filename_matches_path_stem(name, expected):
+    from backend.app.services import assets as assets_service
+
+    assert assets_service.basename_from_filename(name) == expected
+
+
+@pytest.mark.parametrize(
+    "filename,mime,expected",
+    [
+        ("IMG_0001.CR2", None, "RAW"),
+        ("frame.jpeg", "image/png", "JPEG"),
+        ("scan.tif", None, "TIFF"),
+        (".hidden", "image/png", "PNG"),
+        ("trailing.", None, "UNKNOWN"),
+        ("dir.d/noext", None, "UNKNOWN"),
+        ("clip.webp", None, "WEBP"),
+    ],
+)
+def test_detect_asset_format(filename, mime, expected):
+    assert detect_asset_format(filename, mime) == expected
+
+
+@pytest.mark.asyncio
+async def test_metadata_cache_rewritten_after_derivatives_removed(
+    client, TestSessionLocal
+):
+    from backend.app.services import assets as assets_service
+
+    storage = PosixStorage.from_env()
+    async with TestSessionLocal() as session:
+        asset = models.Asset(
+            user_id=USER_ID,
+            original_filename="warm.jpg",
+            mime="image/jpeg",
+            size_bytes=1,
+            status=models.AssetStatus.READY,
+            sha256=uuid.uuid4().hex,
+            metadata_json={"Model": "X"},
+            taken_at=datetime(2024, 3, 14, tzinfo=timezone.utc),
+            width=30,
+            height=20,
+        )
+        session.add(asset)
+        await session.commit()
+
+        await assets_service.ensure_asset_metadata_populated(asset, session, storage)
+        cache_path = assets_service.metadata_cache_path(storage, asset)
+        assert cache_path.exists()
+
+        storage.remove_derivatives(asset.sha256)
+        await assets_service.ensure_asset_metadata_populated(asset, session, storage)
+        assert cache_path.exists()
@@ -4,33 +4,25 @@ import zipfile
 from datetime import datetime, timezone
 
 import pytest
-from sqlalchemy import delete
 
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
 
-@pytest.mark.asyncio
-async def test_bulk_image_export_requires_assets(client, TestSessionLocal):
-    from backend.app import models
-
-    async with TestSessionLocal() as session:
-        await session.execute(delete(models.ProjectAsset))
-        await session.execute(delete(models.Asset))
-        await session.commit()
 
+@pytest.mark.asyncio
+async def test_bulk_image_export_requires_assets(client):
     response = await client.post("/v1/bulk-image-exports")
     assert response.status_code == 400
     assert response.json()["detail"] == "No project images available to export."
 
 
 @pytest.mark.asyncio
-async def test_bulk_image_export_flow(client, TestSessionLocal):
+async def test_bulk_image_export_flow(client, TestSessionLocal, monkeypatch):
     from backend.app import models
     from backend.app.services import bulk_image_exports
     from backend.app.storage import PosixStorage
 
-    async with TestSessionLocal() as session:
-        await session.execute(delete(models.ProjectAsset))
-        await session.execute(delete(models.Asset))
-        await session.commit()
+    # Report progress after every file so the intermediate UPDATE path runs.
+    monkeypatch.setattr(bulk_image_exports, "PROGRESS_INTERVAL_SECONDS", 0)
 
     project_payload = {
         "title": "Bulk Export",
@@ -48,7 +40,7 @@ async def test_bulk_image_export_flow(client, TestSessionLocal):
 
     async with TestSessionLocal() as session:
         asset = models.Asset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            user_id=USER_ID,
             original_filename="Final Shot.jpg",
             mime="image/jpeg",
             size_bytes=10,
@@ -60,7 +52,7 @@ async def test_bulk_image_export_flow(client, TestSessionLocal):
         await session.flush()
         session.add(
             models.ProjectAsset(
-                user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                user_id=USER_ID,
                 project_id=uuid.UUID(project_id),
                 asset_id=asset.id,
             )
@@ -97,5 +89,154 @@ async def test_bulk_image_export_flow(client, TestSessionLocal):
         names = zf.namelist()
         assert len(names) == 1
         assert names[0] == "2024/03/14/Final Shot.jpg"
+        assert zf.getinfo(names[0]).compress_type == zipfile.ZIP_STORED
         with zf.open(names[0]) as fh:
             assert fh.read() == b"image-data"
+
+
+@pytest.mark.asyncio
+async def test_cleanup_bulk_image_exports_clears_expired_jobs(client, TestSessionLocal):
+    from backend.app import models
+    from backend.app.services import bulk_image_exports
+    from backend.app.storage import PosixStorage
+
+    storage = PosixStorage.from_env()
+    job_id = uuid.uuid4()
+    job_dir = storage.exports / job_id.hex
+    job_dir.mkdir(parents=True)
+    artifact = job_dir / "expired.zip"
+    artifact.write_bytes(b"zip")
+
+    async with TestSessionLocal() as session:
+        session.add(
+            models.BulkImageExport(
+                id=job_id,
+                user_id=USER_ID,
+                asset_ids=[],
+                status=models.ExportJobStatus.COMPLETED,
+                artifact_path=storage.storage_key_for(artifact),
+                artifact_filename="expired.zip",
+                artifact_size=3,
+                finished_at=datetime(2000, 1, 1, tzinfo=timezone.utc),
+            )
+        )
+        await session.commit()
+
+    await bulk_image_exports.cleanup_bulk_image_exports()
+
+    assert not job_dir.exists()
+    async with TestSessionLocal() as session:
+        job = await session.get(models.BulkImageExport, job_id)
+        assert job.artifact_path is None
+        assert job.artifact_filename is None
+        assert job.artifact_size is None
+        assert job.expires_at is not None
+
+
+@pytest.mark.asyncio
+async def test_iter_assets_loads_only_job_assets_in_chunks(
+    client, TestSessionLocal, make_linked_asset, monkeypatch
+):
+    from backend.app.services import bulk_image_exports
+
+    monkeypatch.setattr(bulk_image_exports, "CHUNK_SIZE", 2)
+    project_res = await client.post("/v1/projects", json={"title": "Chunks"})
+    assert project_res.status_code == 201
+    project_id = project_res.json()["id"]
+
+    async with TestSessionLocal() as session:
+        assets = []
+        links = {}
+        for day in (3, 1, 2, 4):
+            asset, link = await make_linked_asset(
+                session,
+                project_id,
+                original_filename=f"day{day}.jpg",
+                storage_uri=f"originals/day{day}.jpg",
+                taken_at=datetime(2024, 1, day, tzinfo=timezone.utc),
+            )
+            assets.append(asset)
+            links[asset.id] = link
+        await session.commit()
+
+        # Job ids are in export order; the last asset is not part of the job.
+        wanted = sorted(assets[:3], key=lambda asset: asset.taken_at)
+        # Unlinking after the job was queued does not drop the asset from it.
+        await session.delete(links[wanted[0].id])
+        await session.commit()
+        loaded = [
+            asset.id
+            async for asset in bulk_image_exports._iter_assets(
+                session, [asset.id for asset in wanted], USER_ID
+            )
+        ]
+        assert loaded == [asset.id for asset in wanted]
+
+        with pytest.raises(RuntimeError, match="missing for bulk export"):
+            async for _ in bulk_image_exports._iter_assets(
+                session, [assets[0].id, uuid.uuid4()], USER_ID
+            ):
+                pass
+
+
+@pytest.mark.asyncio
+async def test_bulk_image_export_reports_asset_with_invalid_key(
+    client, TestSessionLocal, make_linked_asset
+):
+    from backend.app.services import bulk_image_exports
+
+    project_res = await client.post("/v1/projects", json={"title": "Bad Key"})
+    assert project_res.status_code == 201
+
+    async with TestSessionLocal() as session:
+        asset, _ = await make_linked_asset(
+            session,
+            project_res.json()["id"],
+            original_filename="escape.jpg",
+            storage_uri="../escape.jpg",
+        )
+        await session.commit()
+
+    start_res = await client.post("/v1/bulk-image-exports")
+    assert start_res.status_code == 201
+    job_id = start_res.json()["id"]
+
+    await bulk_image_exports.process_bulk_image_export(uuid.UUID(job_id))
+
+    status_payload = (await client.get(f"/v1/bulk-image-exports/{job_id}")).json()
+    assert status_payload["status"] == "failed"
+    assert str(asset.id) in status_payload["error_message"]
+    assert "'../escape.jpg'" in status_payload["error_message"]
+
+
+@pytest.mark.asyncio
+async def test_archive_writer_reports_progress_while_draining(monkeypatch, tmp_path):
+    from backend.app.services import bulk_image_exports
+
+    monkeypatch.setattr(bulk_image_exports, "WRITER_QUEUE_SIZE", 2)
+    sources = []
+    for index in range(5):
+        source = tmp_path / f"{index}.jpg"
+        source.write_bytes(b"x" * (index + 1))
+        sources.append(source)
+
+    writer = bulk_image_exports._ArchiveWriter(tmp_path / "out.zip")
+    for source in sources:
+        await writer.add(source, source.name, zipfile.ZIP_STORED)
+    counts = [written async for written in writer.drain()]
+
+    assert counts == sorted(counts)
+    assert writer.written == len(sources)
+    with zipfile.ZipFile(tmp_path / "out.zip") as zf:
+        assert zf.namelist() == [source.name for source in sources]
+
+
+@pytest.mark.asyncio
+async def test_archive_writer_surfaces_writer_errors(tmp_path):
+    from backend.app.services import bulk_image_exports
+
+    writer = bulk_image_exports._ArchiveWriter(tmp_path / "out.zip")
+    await writer.add(tmp_path / "missing.jpg", "missing.jpg", zipfile.ZIP_STORED)
+    with pytest.raises(FileNotFoundError):
+        async for _ in writer.drain():
+            pass
@@ -22,3 +22,36 @@ def test_reports_missing_directory(tmp_path):
     status, message = validate_database_path(target, ensure_writable=False)
     assert status == DatabasePathStatus.NOT_ACCESSIBLE
     assert message == "Directory does not exist."
+
+
+def test_validation_result_is_reused_within_ttl(tmp_path, monkeypatch):
+    from backend.app.services import database_settings
+
+    target = tmp_path / "cached" / "library.db"
+    first = validate_database_path(target, ensure_writable=True)
+    assert first == (DatabasePathStatus.READY, None)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("filesystem probed again")
+
+    monkeypatch.setattr(database_settings.tempfile, "mkstemp", _fail)
+    assert validate_database_path(target, ensure_writable=True) == first
+
+
+def test_rejects_system_directories():
+    status, _ = validate_database_path(Path("/usr/local/arciva.db"))
+    assert status == DatabasePathStatus.INVALID
+    status, _ = validate_database_path(Path("/usrdata/arciva.db"))
+    assert status != DatabasePathStatus.INVALID
+
+
+def test_rejects_parent_segments_into_system_directories():
+    status, _ = validate_database_path("/tmp/../usr/arciva.db")
+    assert status == DatabasePathStatus.INVALID
+
+
+def test_rejects_symlinks_into_system_directories(tmp_path):
+    link = tmp_path / "catalog"
+    link.symlink_to("/etc", target_is_directory=True)
+    status, _ = validate_database_path(str(link / "arciva.db"))
+    assert status == DatabasePathStatus.INVALID
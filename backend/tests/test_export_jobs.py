@@ -0,0 +1,277 @@
+import io
+import uuid
+import zipfile
+
+import pytest
+from PIL import Image
+
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
+
+async def _seed_export_asset(session, project_id, name, mime, payload=None):
+    from backend.app import models
+    from backend.app.storage import PosixStorage
+
+    storage = PosixStorage.from_env()
+    source_path = storage.original_path_for(uuid.uuid4().hex, ".bin")
+    if payload is None:
+        Image.new("RGB", (64, 48), color="#336699").save(source_path, "JPEG")
+    else:
+        source_path.write_bytes(payload)
+    asset = models.Asset(
+        user_id=USER_ID,
+        original_filename=name,
+        mime=mime,
+        size_bytes=source_path.stat().st_size,
+        status=models.AssetStatus.READY,
+        storage_uri=storage.storage_key_for(source_path),
+    )
+    session.add(asset)
+    await session.flush()
+    session.add(
+        models.ProjectAsset(user_id=USER_ID, project_id=project_id, asset_id=asset.id)
+    )
+    return asset.id
+
+
+@pytest.mark.asyncio
+async def test_export_job_flow(client, TestSessionLocal):
+    project_res = await client.post("/v1/projects", json={"title": "Export"})
+    assert project_res.status_code == 201
+    project_id = uuid.UUID(project_res.json()["id"])
+
+    async with TestSessionLocal() as session:
+        asset_ids = [
+            str(await _seed_export_asset(session, project_id, name, "image/jpeg"))
+            for name in ("Frame One.jpg", "Frame Two.jpg")
+        ]
+        await session.commit()
+
+    start_res = await client.post(
+        "/v1/export-jobs",
+        json={
+            "project_id": str(project_id),
+            "photo_ids": asset_ids,
+            "settings": {
+                "size_mode": "resize",
+                "long_edge": 32,
+                "contact_sheet_enabled": True,
+            },
+        },
+    )
+    assert start_res.status_code == 201
+    job_id = start_res.json()["id"]
+
+    status_res = await client.get(f"/v1/export-jobs/{job_id}")
+    payload = status_res.json()
+    assert payload["status"] == "completed", payload["error_message"]
+    assert payload["exported_files"] == 2
+    assert payload["progress"] == 100
+
+    download_res = await client.get(f"/v1/export-jobs/{job_id}/download")
+    assert download_res.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(download_res.content)) as zf:
+        assert sorted(zf.namelist()) == [
+            "contact-sheet.pdf",
+            "frame-one.jpg",
+            "frame-two.jpg",
+        ]
+        assert zf.getinfo("frame-one.jpg").compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("contact-sheet.pdf").compress_type == zipfile.ZIP_STORED
+        with Image.open(io.BytesIO(zf.read("frame-one.jpg"))) as im:
+            assert im.size == (32, 24)
+
+
+@pytest.mark.asyncio
+async def test_export_job_uses_developed_jpeg_for_raw(client, TestSessionLocal):
+    from backend.app import models
+
+    project_res = await client.post("/v1/projects", json={"title": "Developed"})
+    assert project_res.status_code == 201
+    project_id = uuid.UUID(project_res.json()["id"])
+
+    async with TestSessionLocal() as session:
+        jpeg_id = await _seed_export_asset(
+            session, project_id, "DSCF0100.JPG", "image/jpeg"
+        )
+        raw_id = await _seed_export_asset(
+            session, project_id, "DSCF0100.RAF", "image/x-raf", payload=b"raw"
+        )
+        session.add(
+            models.ProjectAssetPair(
+                project_id=project_id,
+                basename="DSCF0100",
+                jpeg_asset_id=jpeg_id,
+                raw_asset_id=raw_id,
+            )
+        )
+        await session.commit()
+
+    start_res = await client.post(
+        "/v1/export-jobs",
+        json={
+            "project_id": str(project_id),
+            "photo_ids": [str(raw_id)],
+            "settings": {"raw_handling": "developed"},
+        },
+    )
+    assert start_res.status_code == 201
+    job_id = start_res.json()["id"]
+
+    download_res = await client.get(f"/v1/export-jobs/{job_id}/download")
+    assert download_res.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(download_res.content)) as zf:
+        assert zf.namelist() == ["dscf0100.jpg"]
+        with Image.open(io.BytesIO(zf.read("dscf0100.jpg"))) as im:
+            assert im.size == (64, 48)
+
+
+@pytest.mark.asyncio
+async def test_export_job_fails_when_developed_jpeg_is_gone(client, TestSessionLocal):
+    from sqlalchemy import delete
+
+    from backend.app import models
+
+    project_res = await client.post("/v1/projects", json={"title": "Unlinked"})
+    assert project_res.status_code == 201
+    project_id = uuid.UUID(project_res.json()["id"])
+
+    async with TestSessionLocal() as session:
+        jpeg_id = await _seed_export_asset(
+            session, project_id, "DSCF0200.JPG", "image/jpeg"
+        )
+        raw_id = await _seed_export_asset(
+            session, project_id, "DSCF0200.RAF", "image/x-raf", payload=b"raw"
+        )
+        session.add(
+            models.ProjectAssetPair(
+                project_id=project_id,
+                basename="DSCF0200",
+                jpeg_asset_id=jpeg_id,
+                raw_asset_id=raw_id,
+            )
+        )
+        await session.flush()
+        await session.execute(
+            delete(models.ProjectAsset).where(models.ProjectAsset.asset_id == jpeg_id)
+        )
+        await session.commit()
+
+    start_res = await client.post(
+        "/v1/export-jobs",
+        json={
+            "project_id": str(project_id),
+            "photo_ids": [str(raw_id)],
+            "settings": {"raw_handling": "developed"},
+        },
+    )
+    assert start_res.status_code == 201
+
+    status_res = await client.get(f"/v1/export-jobs/{start_res.json()['id']}")
+    assert status_res.status_code == 200
+    status_payload = status_res.json()
+    assert status_payload["status"] == "failed"
+    assert str(jpeg_id) in status_payload["error_message"]
+
+
+def test_generate_file_name_suffixes_collisions():
+    from backend.app.services.export_jobs import _generate_file_name
+
+    used: set[str] = set()
+    counters: dict[str, int] = {}
+    names = [
+        _generate_file_name(base, ".jpg", used, counters)
+        for base in ("frame", "frame", "frame-1", "frame", "frame")
+    ]
+    assert names == [
+        "frame.jpg",
+        "frame-1.jpg",
+        "frame-1-1.jpg",
+        "frame-2.jpg",
+        "frame-3.jpg",
+    ]
+    assert _generate_file_name("frame", ".pdf", used, counters) == "frame.pdf"
+
+
+def test_render_image_applies_exif_orientation(tmp_path):
+    from backend.app import schemas
+    from backend.app.services.export_jobs import _render_image
+
+    upright = tmp_path / "upright.jpg"
+    rotated = tmp_path / "rotated.jpg"
+    Image.new("RGB", (64, 48)).save(upright, "JPEG")
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    Image.new("RGB", (64, 48)).save(rotated, "JPEG", exif=exif)
+
+    settings = schemas.ExportJobSettings()
+    for path, size in ((upright, (64, 48)), (rotated, (48, 64))):
+        data, tile = _render_image(path, settings, tile_size=16)
+        with Image.open(io.BytesIO(data)) as im:
+            assert im.size == size
+        assert max(tile.size) == 16
+
+
+@pytest.mark.asyncio
+async def test_render_images_bounds_renders_in_flight(monkeypatch, tmp_path):
+    from backend.app import schemas
+    from backend.app.services import export_jobs
+
+    started = 0
+    written: list[str] = []
+    in_flight: list[int] = []
+
+    def _fake_render(source, settings, tile_size=None):
+        nonlocal started
+        started += 1
+        in_flight.append(started - len(written))
+        return source.name.encode(), None
+
+    async def _no_progress(*_args):
+        return None
+
+    monkeypatch.setattr(export_jobs.os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(export_jobs, "_render_image", _fake_render)
+    monkeypatch.setattr(export_jobs, "_report_progress", _no_progress)
+    monkeypatch.setattr(
+        export_jobs, "_write_member", lambda _zf, member, _data: written.append(member)
+    )
+
+    renders = [(tmp_path / f"{index}.jpg", f"{index}.jpg") for index in range(10)]
+    settings = schemas.ExportJobSettings(contact_sheet_enabled=False)
+    await export_jobs._render_images(None, None, None, renders, settings)
+
+    assert sorted(written) == sorted(member for _, member in renders)
+    assert max(in_flight) <= 2
+
+
+@pytest.mark.asyncio
+async def test_render_images_prefetches_a_bounded_window(monkeypatch, tmp_path):
+    from backend.app import schemas
+    from backend.app.services import export_jobs
+
+    prefetched: list[list[str]] = []
+
+    async def _no_progress(*_args):
+        return None
+
+    monkeypatch.setattr(export_jobs.os, "cpu_count", lambda: 1)
+    monkeypatch.setattr(
+        export_jobs,
+        "_prefetch_sources",
+        lambda paths: prefetched.append([path.name for path in paths]),
+    )
+    monkeypatch.setattr(
+        export_jobs, "_render_image", lambda source, *_args: (b"", None)
+    )
+    monkeypatch.setattr(export_jobs, "_report_progress", _no_progress)
+    monkeypatch.setattr(export_jobs, "_write_member", lambda *_args: None)
+
+    renders = [(tmp_path / f"{index}.jpg", f"{index}.jpg") for index in range(10)]
+    settings = schemas.ExportJobSettings(contact_sheet_enabled=False)
+    await export_jobs._render_images(None, None, None, renders, settings)
+
+    assert max(len(batch) for batch in prefetched) <= 2
+    assert [name for batch in prefetched for name in batch] == [
+        member for _, member in renders
+    ]
@@ -2,21 +2,28 @@ from __future__ import annotations
 
 from io import BytesIO
 
+import pytest
 from PIL import Image
 
 from backend.app.imaging import make_thumb
 
 
-def _sample_image_bytes(width: int = 200, height: int = 100) -> bytes:
+def _sample_image_bytes(width: int = 65, height: int = 65) -> bytes:
     image = Image.new("RGB", (width, height), color="orange")
     with BytesIO() as buffer:
-        image.save(buffer, format="JPEG")
+        # Only the JPEG markers and dimensions matter to the tests.
+        image.save(buffer, format="JPEG", quality=75, optimize=False)
         return buffer.getvalue()
 
 
-def test_make_thumb_from_bytes_returns_jpeg() -> None:
-    payload = _sample_image_bytes()
-    thumb_bytes, dims = make_thumb(None, 64, image_bytes=payload)
+@pytest.fixture(scope="module")
+def sample_jpeg_bytes() -> bytes:
+    # One pixel over the 64px target, so make_thumb still has to downscale.
+    return _sample_image_bytes()
+
+
+def test_make_thumb_from_bytes_returns_jpeg(sample_jpeg_bytes: bytes) -> None:
+    thumb_bytes, dims = make_thumb(None, 64, image_bytes=sample_jpeg_bytes)
 
     assert thumb_bytes.startswith(b"\xff\xd8")
     assert max(dims) <= 64
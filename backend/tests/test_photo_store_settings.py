@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+
+from backend.app.services import photo_store_settings
+
+
+def test_copy_directory_copies_photo_subdirs(tmp_path):
+    source = tmp_path / "old"
+    destination = tmp_path / "new"
+    original = source / "originals" / "ab" / "cd" / "file.jpg"
+    original.parent.mkdir(parents=True)
+    original.write_bytes(b"pixels")
+
+    photo_store_settings._copy_directory(source, destination)
+
+    copied = destination / "originals" / "ab" / "cd" / "file.jpg"
+    assert copied.read_bytes() == b"pixels"
+    assert copied.stat().st_mtime == original.stat().st_mtime
+    for name in photo_store_settings.PHOTO_SUBDIRS:
+        assert (destination / name).is_dir()
+
+
+def test_is_protected_matches_whole_path_components():
+    assert photo_store_settings._is_protected(Path("/"))
+    assert photo_store_settings._is_protected(Path("/usr"))
+    assert photo_store_settings._is_protected(Path("/etc/arciva"))
+    assert not photo_store_settings._is_protected(Path("/usrdata/photos"))
+    assert not photo_store_settings._is_protected(Path("/home/me/Arciva"))
+
+
+def test_state_file_is_parsed_once_until_it_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(photo_store_settings, "CONFIG_DIR", tmp_path)
+    monkeypatch.setattr(
+        photo_store_settings, "CONFIG_FILE", tmp_path / "photo_store_state.json"
+    )
+    root = tmp_path / "store"
+
+    photo_store_settings.load_photo_store_state(root)
+    first = photo_store_settings.load_photo_store_state(root)
+    calls = []
+    original_normalize = photo_store_settings._normalize_path
+
+    def _counting_normalize(candidate):
+        calls.append(candidate)
+        return original_normalize(candidate)
+
+    monkeypatch.setattr(photo_store_settings, "_normalize_path", _counting_normalize)
+    second = photo_store_settings.load_photo_store_state(root)
+    assert calls == []
+    assert second == first
+    second.locations.clear()
+    assert photo_store_settings.load_photo_store_state(root).locations
+
+    updated = photo_store_settings.update_state(first, tmp_path / "other", "add")
+    photo_store_settings.persist_photo_store_state(updated)
+    reloaded = photo_store_settings.load_photo_store_state(root)
+    assert [loc.path for loc in reloaded.locations] == [
+        str(tmp_path / "other"),
+        str(root),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_location_payload_reports_each_location(tmp_path):
+    online = tmp_path / "online"
+    online.mkdir()
+    state = photo_store_settings.PhotoStoreState(
+        locations=[
+            photo_store_settings.StoredLocation(
+                id="a", path=str(online), role="primary", created_at="now"
+            ),
+            photo_store_settings.StoredLocation(
+                id="b",
+                path=str(tmp_path / "offline"),
+                role="secondary",
+                created_at="now",
+            ),
+        ],
+        last_option=None,
+        updated_at=None,
+    )
+
+    entries = await photo_store_settings.make_location_payload(state)
+
+    assert [(entry["id"], entry["status"]) for entry in entries] == [
+        ("a", "available"),
+        ("b", "missing"),
+    ]
+
+
+def test_apply_state_refreshes_memoized_storage(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from backend.app import storage as storage_module
+
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    link = tmp_path / "media"
+    link.symlink_to(first)
+    settings = SimpleNamespace(photo_store_locations=[])
+    state = photo_store_settings.PhotoStoreState(
+        locations=[
+            photo_store_settings.StoredLocation(
+                id="primary", path=str(link), role="primary", created_at="now"
+            )
+        ]
+    )
+    monkeypatch.setattr(storage_module, "get_settings", lambda: settings)
+    photo_store_settings.apply_state_to_settings(settings, state)
+    storage = storage_module.PosixStorage.from_env()
+    assert storage.storage_key_for(first / "originals" / "a.jpg") == "originals/a.jpg"
+
+    link.unlink()
+    link.symlink_to(second)
+    photo_store_settings.apply_state_to_settings(settings, state)
+
+    assert storage_module.PosixStorage.from_env() is storage
+    assert storage.storage_key_for(second / "originals" / "a.jpg") == "originals/a.jpg"
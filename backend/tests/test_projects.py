@@ -5,6 +5,8 @@ import uuid
 import pytest
 from sqlalchemy import select
 
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
 
 class _FakeRedis:
     async def enqueue_job(self, *_args, **_kwargs):
@@ -105,8 +107,9 @@ async def test_update_stack_pairs_toggle(client):
 
 
 @pytest.mark.asyncio
-async def test_projects_list_includes_picked_previews(client, TestSessionLocal):
-    from backend.app import models
+async def test_projects_list_includes_picked_previews(
+    client, TestSessionLocal, make_linked_asset
+):
     from backend.app.storage import PosixStorage
 
     payload = {"title": "Picked Previews", "client": "ACME", "note": "pick"}
@@ -122,30 +125,17 @@ async def test_projects_list_includes_picked_previews(client, TestSessionLocal):
     thumb_path.write_bytes(b"thumb")
 
     async with TestSessionLocal() as session:
-        asset = models.Asset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        asset, _ = await make_linked_asset(
+            session,
+            proj_id,
             original_filename="picked.jpg",
-            mime="image/jpeg",
             size_bytes=111,
-            status=models.AssetStatus.READY,
             storage_uri=storage.storage_key_for(original_path),
             sha256=sha,
-            reference_count=1,
             width=4000,
             height=2667,
+            picked=True,
         )
-        session.add(asset)
-        await session.flush()
-        link = models.ProjectAsset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
-            project_id=uuid.UUID(proj_id),
-            asset_id=asset.id,
-            is_preview=False,
-            preview_order=None,
-        )
-        session.add(link)
-        await session.flush()
-        session.add(models.MetadataState(link_id=link.id, picked=True))
         await session.commit()
         asset_id = str(asset.id)
 
@@ -183,7 +173,7 @@ async def test_delete_project_requires_confirmation(client):
 
 
 @pytest.mark.asyncio
-async def test_delete_project_keep_assets(client, TestSessionLocal):
+async def test_delete_project_keep_assets(client, TestSessionLocal, make_linked_asset):
     from backend.app import models
     from backend.app.storage import PosixStorage
 
@@ -201,28 +191,16 @@ async def test_delete_project_keep_assets(client, TestSessionLocal):
     thumb_path.write_bytes(b"thumb")
 
     async with TestSessionLocal() as session:
-        asset = models.Asset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        asset, _ = await make_linked_asset(
+            session,
+            proj_id,
             original_filename="keep.jpg",
-            mime="image/jpeg",
             size_bytes=123,
-            status=models.AssetStatus.READY,
             storage_uri=storage.storage_key_for(original_path),
             sha256=sha,
-            reference_count=1,
-        )
-        session.add(asset)
-        await session.flush()
-        link = models.ProjectAsset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
-            project_id=uuid.UUID(proj_id),
-            asset_id=asset.id,
             is_preview=True,
             preview_order=0,
         )
-        session.add(link)
-        await session.flush()
-        session.add(models.MetadataState(link_id=link.id))
         await session.commit()
         asset_id = asset.id
 
@@ -251,7 +229,9 @@ async def test_delete_project_keep_assets(client, TestSessionLocal):
 
 
 @pytest.mark.asyncio
-async def test_delete_project_remove_assets(client, TestSessionLocal):
+async def test_delete_project_remove_assets(
+    client, TestSessionLocal, make_linked_asset
+):
     from backend.app import models
     from backend.app.storage import PosixStorage
 
@@ -269,28 +249,14 @@ async def test_delete_project_remove_assets(client, TestSessionLocal):
     thumb_path.write_bytes(b"thumb")
 
     async with TestSessionLocal() as session:
-        asset = models.Asset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        asset, _ = await make_linked_asset(
+            session,
+            proj_id,
             original_filename="remove.jpg",
-            mime="image/jpeg",
             size_bytes=321,
-            status=models.AssetStatus.READY,
             storage_uri=storage.storage_key_for(original_path),
             sha256=sha,
-            reference_count=1,
-        )
-        session.add(asset)
-        await session.flush()
-        link = models.ProjectAsset(
-            user_id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
-            project_id=uuid.UUID(proj_id),
-            asset_id=asset.id,
-            is_preview=False,
-            preview_order=None,
         )
-        session.add(link)
-        await session.flush()
-        session.add(models.MetadataState(link_id=link.id))
         await session.commit()
         asset_id = asset.id
 
@@ -309,3 +275,28 @@ async def test_delete_project_remove_assets(client, TestSessionLocal):
 
     assert not original_path.exists()
     assert not thumb_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_ensure_project_access_reuses_session_lookup(TestSessionLocal):
+    from fastapi import HTTPException
+
+    from backend.app import models
+    from backend.app.utils.projects import ensure_project_access
+
+    user_id = USER_ID
+    async with TestSessionLocal() as session:
+        project = models.Project(title="Access", user_id=user_id)
+        session.add(project)
+        await session.flush()
+
+        first = await ensure_project_access(
+            session, project_id=project.id, user_id=user_id
+        )
+        assert first is project
+        assert session.info["_project_access_cache"][(project.id, user_id)] is project
+
+        await session.delete(project)
+        await session.flush()
+        with pytest.raises(HTTPException):
+            await ensure_project_access(session, project_id=project.id, user_id=user_id)
@@ -10,6 +10,8 @@ from backend.app import models, schemas
 from backend.app.services import adjustments as adjustments_service
 from backend.app.storage import PosixStorage
 
+USER_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+
 
 @pytest.mark.skip(reason="QuickFix backend rendering disabled")
 def test_apply_adjustments_pipeline_changes_pixels():
@@ -50,7 +52,7 @@ def test_apply_adjustments_with_grain_is_deterministic():
 @pytest.mark.asyncio
 async def test_quick_fix_preview_and_save(client, TestSessionLocal):
     storage = PosixStorage.from_env()
-    user_id = uuid.UUID("12345678-1234-5678-1234-567812345678")
+    user_id = USER_ID
 
     project_response = await client.post(
         "/v1/projects", json={"title": "Quick Fix", "client": "Test"}
@@ -133,3 +135,16 @@ async def test_quick_fix_preview_and_save(client, TestSessionLocal):
         ).scalar_one()
 
         assert state.edits["quick_fix"]["exposure"]["exposure"] == 0.5
+
+
+def test_neutral_exposure_and_color_return_input_unchanged():
+    base = Image.new("RGBA", (8, 8), color=(10, 20, 30, 40))
+
+    exposure = adjustments_service.apply_exposure(base, schemas.ExposureSettings())
+    color = adjustments_service.apply_color_balance(
+        base, schemas.ColorSettings(temperature=0.0005, tint=-0.0005)
+    )
+
+    assert exposure is base
+    assert color is base
+    assert exposure.mode == "RGBA"
@@ -0,0 +1,142 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from backend.app.storage import PosixStorage
+
+
+def _storage(root) -> PosixStorage:
+    return PosixStorage(
+        root=root,
+        uploads=root / "uploads",
+        originals=root / "originals",
+        derivatives=root / "derivatives",
+        exports=root / "exports",
+    )
+
+
+def test_move_to_originals_replaces_duplicate(tmp_path):
+    storage = _storage(tmp_path)
+    for name in ("first", "second"):
+        temp = storage.temp_path_for(name)
+        temp.parent.mkdir(parents=True, exist_ok=True)
+        temp.write_bytes(b"pixels")
+        dest = storage.move_to_originals(temp, "abc123", "jpg")
+        assert not temp.exists()
+
+    assert dest == tmp_path / "originals" / "abc123.jpg"
+    assert dest.read_bytes() == b"pixels"
+
+
+def test_derivative_path_recreates_directory_after_removal(tmp_path):
+    storage = _storage(tmp_path)
+    path = storage.derivative_path("abc123", "thumb_256", "jpg")
+    assert path.parent.is_dir()
+
+    storage.remove_derivatives("abc123")
+    assert not path.parent.exists()
+
+    assert storage.derivative_path("abc123", "thumb_256", "jpg").parent.is_dir()
+
+    # Another process (e.g. the API while the worker runs) removing the
+    # directory must not leave this instance believing it still exists.
+    shutil.rmtree(path.parent)
+    storage.derivative_path("abc123", "thumb_256", "jpg").write_bytes(b"thumb")
+
+
+def test_storage_keys_follow_root_after_invalidate(tmp_path):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+    link = tmp_path / "media"
+    link.symlink_to(first)
+    storage = _storage(link)
+
+    assert storage.storage_key_for(first / "originals" / "a.jpg") == "originals/a.jpg"
+
+    link.unlink()
+    link.symlink_to(second)
+    storage.invalidate()
+    assert storage.storage_key_for(second / "originals" / "a.jpg") == "originals/a.jpg"
+
+
+def test_storage_key_for_rejects_parent_segments(tmp_path):
+    storage = _storage(tmp_path / "media")
+    (tmp_path / "media").mkdir()
+
+    assert (
+        storage.storage_key_for(tmp_path / "media" / "derivatives" / "ab" / "t.jpg")
+        == "derivatives/ab/t.jpg"
+    )
+    with pytest.raises(ValueError):
+        storage.storage_key_for(Path(f"{tmp_path}/media/../outside.jpg"))
+
+
+def test_find_derivative_sees_local_writes_and_removals(tmp_path):
+    storage = _storage(tmp_path)
+    assert storage.find_derivative("abc123", "thumb_256", "jpg") is None
+
+    path = storage.derivative_path("abc123", "thumb_256", "jpg")
+    path.write_bytes(b"thumb")
+    assert storage.find_derivative("abc123", "thumb_256", "jpg") == path
+
+    storage.remove_derivatives("abc123")
+    assert storage.find_derivative("abc123", "thumb_256", "jpg") is None
+
+
+def test_find_derivatives_bulk_searches_every_root(tmp_path):
+    storage = _storage(tmp_path / "primary")
+    secondary = tmp_path / "secondary" / "derivatives"
+    storage._extra_derivative_roots.append(secondary)
+    thumb = storage.derivative_path("abc123", "thumb_256", "jpg")
+    thumb.write_bytes(b"thumb")
+    preview = secondary / "abc123" / "preview_raw.jpg"
+    preview.parent.mkdir(parents=True)
+    preview.write_bytes(b"preview")
+
+    found = storage.find_derivatives_bulk(
+        "abc123", [("thumb_256", "jpg"), ("preview_raw", "jpg"), ("medium", "jpg")]
+    )
+
+    assert found == {("thumb_256", "jpg"): thumb, ("preview_raw", "jpg"): preview}
+    assert storage.find_derivative("abc123", "medium", "jpg") is None
+
+
+@pytest.mark.parametrize("key", ["../etc/passwd", "originals/../../x", "./", "."])
+def test_path_from_key_rejects_invalid_keys(tmp_path, key):
+    with pytest.raises(ValueError):
+        _storage(tmp_path).path_from_key(key)
+
+
+def test_path_from_key_normalizes_relative_keys(tmp_path):
+    storage = _storage(tmp_path)
+    expected = tmp_path.resolve() / "originals" / "a.jpg"
+    assert storage.path_from_key("originals//./a.jpg") == expected
+    assert storage.path_from_key("file://originals/a.jpg") == expected
+
+
+def test_path_from_key_rejects_symlink_escaping_root(tmp_path):
+    root = tmp_path / "media"
+    outside = tmp_path / "outside"
+    root.mkdir()
+    outside.mkdir()
+    (root / "originals").symlink_to(outside, target_is_directory=True)
+
+    with pytest.raises(ValueError, match="escapes media root"):
+        _storage(root).path_from_key("originals/a.jpg")
+
+
+@pytest.mark.asyncio
+async def test_remove_derivatives_async_clears_every_root(tmp_path):
+    storage = _storage(tmp_path / "primary")
+    secondary = tmp_path / "secondary" / "derivatives"
+    storage._extra_derivative_roots.append(secondary)
+    storage.derivative_path("abc123", "thumb_256", "jpg").write_bytes(b"thumb")
+    (secondary / "abc123").mkdir(parents=True)
+
+    await storage.remove_derivatives_async("abc123")
+
+    assert not (storage.derivatives / "abc123").exists()
+    assert not (secondary / "abc123").exists()